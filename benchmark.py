@@ -0,0 +1,358 @@
+"""
+@file
+@brief This module provides the load test and benchmark of the shop's routes.
+@details Virtual users drive the real routes concurrently, each from its own thread: customers
+         log in, browse the vegetables, place an order, pay for it and look at it; staff log in,
+         generate the weekly sales report and export the customer list as CSV. The users run
+         against the WSGI app in the same process, or against a running server given by its URL
+         (which may have several worker processes). Every route gets its throughput, p50/p95/p99
+         latency and SQL statements per request; results can be saved as a named baseline under
+         benchmarks/, and later runs compared with it, so regressions show up as a diff.
+         Run it with `flask --app main:Initialize_app benchmark --help`, against a database set
+         aside for it: the benchmark users and items are added to the configured database.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+import click
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+from models import db, Staff, Customer, CorporateCustomer, Veggie, UnitPricing
+
+# Directory of the saved baselines
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+# Password of every benchmark user
+PASSWORD = "bench"
+
+def seed_benchmark_data(customers=20, staff=2, items=20):
+    """
+    @brief Add the benchmark users and items to the database, unless they are already there.
+    @param customers Number of customers, every fifth one corporate.
+    @param staff Number of staff members.
+    @param items Number of vegetables sold by unit.
+    @return Tuple of (customer usernames, staff usernames).
+    """
+    customer_names = [f"bench_customer_{number}" for number in range(customers)]
+    staff_names = [f"bench_staff_{number}" for number in range(staff)]
+    existing = set(db.session.execute(
+        select(Staff.username).where(Staff.username.in_(staff_names))).scalars())
+    existing |= set(db.session.execute(
+        select(Customer.username).where(Customer.username.in_(customer_names))).scalars())
+
+    staff_members = []
+    for number, username in enumerate(staff_names):
+        if username not in existing:
+            staff_members.append(Staff(first_name="Bench", last_name=f"Staff {number}", username=username,
+                                       password=PASSWORD, dept_name="Benchmark", staff_id=f"BS{number}"))
+    db.session.add_all(staff_members)
+    for number, username in enumerate(customer_names):
+        if username in existing:
+            continue
+        fields = dict(first_name="Bench", last_name=f"Customer {number}", username=username, password=PASSWORD,
+                      cust_address=f"{number} Bench St", cust_id=f"BC{number}", distance_from_store=5.0,
+                      cust_balance=0.0, max_owing=100.0)
+        # Corporate customers may order while their balance is at least their credit limit
+        db.session.add(CorporateCustomer(max_credit=0.0, min_balance=0.0, **fields) if number % 5 == 4
+                       else Customer(**fields))
+    db.session.flush()
+
+    if not db.session.execute(select(Veggie.id).where(Veggie.name.like("Bench %")).limit(1)).first():
+        staff_id = db.session.execute(select(Staff.id).where(Staff.username == staff_names[0])).scalar()
+        db.session.add_all([
+            Veggie(name=f"Bench {number}", price=1.0, type="Veggie", stock_quantity=10 ** 9,
+                   veg_name=f"Bench {number}", staff_id=staff_id, unit_pricing=UnitPricing(price_per_unit=1.0, quantity=1))
+            for number in range(items)
+        ])
+    db.session.commit()
+    return customer_names, staff_names
+
+class Exchange:
+    """
+    @brief Outcome of one request.
+    """
+
+    def __init__(self, status, location, queries):
+        self.status = status
+        self.location = location
+        self.queries = queries
+
+# Statements run by the requests of each in-process client thread
+_statements = threading.local()
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_statements, "count", None) is not None:
+        _statements.count += 1
+
+class WsgiClient:
+    """
+    @brief Client sending requests to the WSGI app in this process.
+    @details Statements are counted on the thread of the client, which also reads the whole body,
+             so the statements of streamed responses count too.
+    """
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        _statements.count = 0
+        try:
+            response = self.client.open(path, method=method, data=data)
+            response.get_data()
+            return Exchange(response.status_code, response.headers.get("Location"), _statements.count)
+        finally:
+            _statements.count = None
+
+class HttpClient:
+    """
+    @brief Client sending requests to a running server, keeping its cookies and not following redirects.
+    @details Statements are taken from the X-DB-Query-Count header, sent by servers started with
+             QUERY_STATS_HEADERS=true; the statements of streamed responses are not in it.
+    """
+
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), self._NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        try:
+            response = self.opener.open(urllib.request.Request(self.base_url + path, data=body, method=method))
+        except urllib.error.HTTPError as error:
+            response = error
+        with response:
+            response.read()
+            queries = response.headers.get("X-DB-Query-Count")
+            return Exchange(response.status, response.headers.get("Location"), int(queries) if queries else None)
+
+def customer_journey(username, item_ids, step):
+    """
+    @brief Log a customer in, browse the vegetables, place an order, pay for it and look at it.
+    @return Generator of (route, expected statuses, method, path, form) steps; receives each Exchange.
+    """
+    yield "login", (302,), "POST", "/login", {"username": username, "password": PASSWORD}
+    yield "view_vegetables", (200,), "GET", "/vegetables", None
+    item_id = item_ids[step % len(item_ids)]
+    placed = yield "place_order", (302,), "POST", "/place_order", {f"order_{item_id}": "2", f"order_type_{item_id}": "unit"}
+    match = re.search(r"/checkout/(\d+)", placed.location or "")
+    if match is None:
+        return
+    order_id = match.group(1)
+    yield "checkout", (302,), "POST", f"/checkout/{order_id}", {
+        "payment_method": "Credit Card", "payment_amount": "2", "card_number": "4111111111111111",
+        "card_expiry_date": "12/30", "card_type": "Visa"}
+    yield "my_orders", (200,), "GET", f"/my_orders/{order_id}", None
+
+def staff_journey(username, item_ids, step):
+    """
+    @brief Log a staff member in, generate the weekly sales report and export the customer list.
+    @return Generator of (route, expected statuses, method, path, form) steps; receives each Exchange.
+    """
+    yield "login", (302,), "POST", "/login", {"username": username, "password": PASSWORD}
+    yield "generate_report", (200,), "POST", "/generate_report", {"report_type": "weekly"}
+    yield "generate_customer_list", (200,), "GET", "/generate_customer_list", None
+
+class RouteStats:
+    """
+    @brief Thread-safe latencies and statement counts of one route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+
+    def add(self, latency, queries, ok):
+        with self._lock:
+            self.latencies.append(latency)
+            if queries is not None:
+                self.queries.append(queries)
+            if not ok:
+                self.errors += 1
+
+def percentile(values, percent):
+    """
+    @brief Nearest-rank percentile.
+    @param values Non-empty list of numbers.
+    @param percent Percentile, between 0 and 100.
+    @return The smallest value that percent of the values are at most.
+    """
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+def run_benchmark(make_client, customers, staff, item_ids, users=8, staff_users=1, iterations=10):
+    """
+    @brief Drive the routes with concurrent virtual users.
+    @param make_client Function returning a new client, WsgiClient or HttpClient.
+    @param customers Usernames of the customers the virtual customers log in as.
+    @param staff Usernames of the staff members the virtual staff log in as.
+    @param item_ids Ids of the vegetables ordered.
+    @param users Number of virtual customers.
+    @param staff_users Number of virtual staff members.
+    @param iterations Number of journeys of every virtual user.
+    @return Results, see summarize.
+    """
+    stats = {}
+    stats_lock = threading.Lock()
+
+    def route_stats(route):
+        with stats_lock:
+            return stats.setdefault(route, RouteStats())
+
+    def virtual_user(journey, username):
+        client = make_client()
+        for step in range(iterations):
+            steps = journey(username, item_ids, step)
+            exchange = None
+            try:
+                while True:
+                    route, expected, method, path, form = steps.send(exchange)
+                    started = time.perf_counter()
+                    try:
+                        exchange = client.request(method, path, form)
+                    except Exception:
+                        route_stats(route).add(time.perf_counter() - started, None, False)
+                        break
+                    route_stats(route).add(time.perf_counter() - started, exchange.queries, exchange.status in expected)
+            except StopIteration:
+                pass
+
+    threads = [threading.Thread(target=virtual_user, args=(customer_journey, customers[number % len(customers)]))
+               for number in range(users)]
+    threads += [threading.Thread(target=virtual_user, args=(staff_journey, staff[number % len(staff)]))
+                for number in range(staff_users)]
+    event.listen(Engine, "before_cursor_execute", _count_statement)
+    try:
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(Engine, "before_cursor_execute", _count_statement)
+    return summarize(stats, elapsed)
+
+def summarize(stats, elapsed):
+    """
+    @brief Summarize the requests of a run.
+    @param stats Dictionary of route names and RouteStats.
+    @param elapsed Seconds the run took.
+    @return Dictionary with the elapsed time, overall throughput and the figures of every route.
+    """
+    routes = {}
+    for route, route_stats in sorted(stats.items()):
+        latencies = route_stats.latencies
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": route_stats.errors,
+            "throughput": round(len(latencies) / elapsed, 3),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "queries_per_request": round(sum(route_stats.queries) / len(route_stats.queries), 2)
+                                   if route_stats.queries else None,
+        }
+    total = sum(route["requests"] for route in routes.values())
+    return {"elapsed_s": round(elapsed, 3), "throughput": round(total / elapsed, 3), "routes": routes}
+
+def compare(baseline, results, tolerance=0.2):
+    """
+    @brief Compare a run with a baseline.
+    @param baseline Results of the baseline run.
+    @param results Results of this run.
+    @param tolerance Relative growth of p95 latency tolerated before it counts as a regression.
+    @return List of (route, figure, baseline value, value, regression) for every route of both runs.
+    """
+    rows = []
+    for route, figures in results["routes"].items():
+        base = baseline["routes"].get(route)
+        if base is None:
+            continue
+        for figure in ("throughput", "p50_ms", "p95_ms", "p99_ms", "queries_per_request"):
+            before, after = base.get(figure), figures.get(figure)
+            if figure == "p95_ms":
+                regression = before is not None and after > before * (1 + tolerance)
+            elif figure == "queries_per_request":
+                # Statement counts do not depend on the machine, any growth is a regression
+                regression = before is not None and after is not None and after > before
+            else:
+                regression = False
+            rows.append((route, figure, before, after, regression))
+    return rows
+
+def baseline_path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def save_baseline(name, results):
+    """
+    @brief Save the results of a run as a named baseline.
+    @param name Name of the baseline.
+    @param results Results of the run.
+    """
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(name), "w") as baseline_file:
+        json.dump(results, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+def load_baseline(name):
+    with open(baseline_path(name)) as baseline_file:
+        return json.load(baseline_file)
+
+@click.command("benchmark")
+@click.option("--url", default=None, help="Drive a running server instead of the app in this process.")
+@click.option("--customers", default=20, show_default=True, help="Benchmark customers to seed.")
+@click.option("--staff", default=2, show_default=True, help="Benchmark staff members to seed.")
+@click.option("--items", default=20, show_default=True, help="Benchmark vegetables to seed.")
+@click.option("--users", default=8, show_default=True, help="Concurrent virtual customers.")
+@click.option("--staff-users", default=1, show_default=True, help="Concurrent virtual staff members.")
+@click.option("--iterations", default=10, show_default=True, help="Journeys of every virtual user.")
+@click.option("--save", "save_as", default=None, help="Save the results as the named baseline.")
+@click.option("--compare", "compare_with", default=None, help="Compare the results with the named baseline.")
+@click.option("--tolerance", default=0.2, show_default=True, help="Tolerated relative growth of p95 latency.")
+def benchmark_command(url, customers, staff, items, users, staff_users, iterations, save_as, compare_with, tolerance):
+    """Drive the shop's routes with concurrent virtual users and report their latency."""
+    customer_names, staff_names = seed_benchmark_data(customers, staff, items)
+    item_ids = db.session.execute(
+        select(Veggie.id).where(Veggie.name.like("Bench %")).order_by(Veggie.id)
+    ).scalars().all()
+    db.session.remove()
+
+    app = current_app._get_current_object()
+    make_client = (lambda: HttpClient(url)) if url else (lambda: WsgiClient(app))
+    results = run_benchmark(make_client, customer_names, staff_names, item_ids, users, staff_users, iterations)
+
+    click.echo(f"{'route':<24}{'requests':>9}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for route, figures in results["routes"].items():
+        queries = figures["queries_per_request"]
+        click.echo(f"{route:<24}{figures['requests']:>9}{figures['errors']:>7}{figures['throughput']:>9.1f}"
+                   f"{figures['p50_ms']:>9.1f}{figures['p95_ms']:>9.1f}{figures['p99_ms']:>9.1f}"
+                   f"{'-' if queries is None else f'{queries:.1f}':>9}")
+    click.echo(f"{results['throughput']:.1f} requests/s over {results['elapsed_s']:.1f}s")
+
+    regressions = []
+    if compare_with:
+        click.echo(f"\nCompared with baseline {compare_with}:")
+        for route, figure, before, after, regression in compare(load_baseline(compare_with), results, tolerance):
+            change = f"{(after - before) / before:+.0%}" if before and after is not None else ""
+            click.echo(f"{'!' if regression else ' '} {route:<24}{figure:<20}{before!s:>10} -> {after!s:<10}{change}")
+            if regression:
+                regressions.append((route, figure))
+    if save_as:
+        save_baseline(save_as, results)
+        click.echo(f"Saved baseline {save_as} to {baseline_path(save_as)}")
+    if regressions:
+        raise click.ClickException(f"{len(regressions)} regressions compared with baseline {compare_with}")
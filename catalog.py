@@ -0,0 +1,207 @@
+"""
+@file
+@brief This module provides the process-wide item catalog cache.
+@details The catalog (every item with its vegetable and premade box pricing) is loaded once per
+         worker process and kept until the catalog version stored in the database changes.
+         The version is polled at most every CATALOG_VERSION_POLL_SECONDS, so catalog reads
+         cost no queries at all in the steady state. Stock is left out of the catalog: it changes
+         with every order and is read live, see inventory.stock_levels.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event, insert, inspect, select, update
+from metrics import record_cache
+from models import db, Item, Veggie, UnitPricing, WeightPricing, PackPricing, PremadeBox, CatalogVersion
+
+CATALOG_VERSION_ID = 1
+
+# Immutable snapshot of one item, safe to share between requests and threads
+CatalogItem = namedtuple("CatalogItem", [
+    "id", "name", "description", "price", "type", "veg_name",
+    "price_per_unit", "unit_quantity", "weight_per_kilo", "weight", "price_per_pack", "num_of_pack",
+    "box_size", "num_of_boxes",
+])
+
+class Catalog:
+    """
+    @brief Snapshot of the item catalog at one catalog version.
+    """
+
+    def __init__(self, version, items):
+        """
+        @brief Index the items of the snapshot.
+        @param version Catalog version the snapshot was loaded at.
+        @param items List of CatalogItem ordered by id.
+        """
+        self.version = version
+        self.items = items
+        self.by_id = {item.id: item for item in items}
+        # Items shown on the vegetables page
+        self.listed_items = [item for item in items if item.type in ('Veggie', 'Box')]
+        # Vegetables that can be ordered, with their unit, weight and pack pricing
+        self.veggies = {item.id: item for item in items if item.type == 'Veggie'}
+        # First premade box of every size
+        self.boxes = {}
+        for item in items:
+            if item.box_size is not None:
+                self.boxes.setdefault(item.box_size, item)
+
+def load_catalog(version):
+    """
+    @brief Load every item together with all of its unit, weight, pack and box pricing in a single query.
+    @param version Catalog version read before loading.
+    @return Catalog snapshot.
+    """
+    items = Item.__table__
+    veggies = Veggie.__table__
+    unit = UnitPricing.__table__
+    weighted = WeightPricing.__table__
+    pack = PackPricing.__table__
+    boxes = PremadeBox.__table__
+
+    rows = db.session.execute(
+        select(
+            items.c.id, items.c.name, items.c.description, items.c.price, items.c.type,
+            veggies.c.veg_name,
+            unit.c.price_per_unit, unit.c.quantity.label("unit_quantity"),
+            weighted.c.weight_per_kilo, weighted.c.weight,
+            pack.c.price_per_pack, pack.c.num_of_pack,
+            boxes.c.box_size, boxes.c.num_of_boxes,
+        )
+        .select_from(
+            items.outerjoin(veggies, veggies.c.id == items.c.id)
+            .outerjoin(unit, unit.c.id == veggies.c.id)
+            .outerjoin(weighted, weighted.c.id == veggies.c.id)
+            .outerjoin(pack, pack.c.id == veggies.c.id)
+            .outerjoin(boxes, boxes.c.id == items.c.id)
+        )
+        .order_by(items.c.id)
+    ).all()
+    return Catalog(version, [CatalogItem(**row._mapping) for row in rows])
+
+def current_catalog_version():
+    """
+    @brief Read the catalog version from the database.
+    @return Catalog version, or 0 if it has never been set.
+    """
+    catalog_version = CatalogVersion.__table__
+    version = db.session.execute(
+        select(catalog_version.c.version).where(catalog_version.c.id == CATALOG_VERSION_ID)
+    ).scalar()
+    return version or 0
+
+def bump_catalog_version(session=None):
+    """
+    @brief Increase the catalog version in the current transaction.
+    @details Call after changing items or prices with Core statements; ORM changes to items
+             are picked up automatically when they are flushed. Every worker reloads its catalog
+             once the transaction commits.
+    @param session Session whose transaction to use, defaults to the application session.
+    """
+    session = session if session is not None else db.session
+    connection = session.connection()
+    catalog_version = CatalogVersion.__table__
+    result = connection.execute(
+        update(catalog_version)
+        .where(catalog_version.c.id == CATALOG_VERSION_ID)
+        .values(version=catalog_version.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(catalog_version).values(id=CATALOG_VERSION_ID, version=1))
+    session.info["catalog_changed"] = True
+
+class CatalogCache:
+    """
+    @brief Thread-safe cache holding the catalog snapshot of one worker process.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        @brief Create an empty cache.
+        @param clock Function returning the current time in seconds.
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._checked_at = None
+
+    def _fresh(self, now, poll_seconds):
+        return self._catalog is not None and self._checked_at is not None and now - self._checked_at < poll_seconds
+
+    def get(self, poll_seconds):
+        """
+        @brief Return the cached catalog, reloading it if the catalog version has changed.
+        @param poll_seconds Seconds to trust the cached catalog before checking the version again.
+        @return Catalog snapshot.
+        """
+        now = self._clock()
+        if self._fresh(now, poll_seconds):
+            record_cache("catalog", True)
+            return self._catalog
+        with self._lock:
+            # Another thread may have revalidated the catalog while this one waited for the lock
+            if self._fresh(now, poll_seconds):
+                record_cache("catalog", True)
+                return self._catalog
+            # Read the version before the items, so the snapshot is never older than its version
+            version = current_catalog_version()
+            reload = self._catalog is None or self._catalog.version != version
+            if reload:
+                self._catalog = load_catalog(version)
+            record_cache("catalog", not reload)
+            self._checked_at = now
+            return self._catalog
+
+    def invalidate(self):
+        """
+        @brief Check the catalog version on the next read, whatever the poll interval.
+        """
+        self._checked_at = None
+
+    def clear(self):
+        """
+        @brief Drop the cached catalog.
+        """
+        with self._lock:
+            self._catalog = None
+            self._checked_at = None
+
+catalog_cache = CatalogCache()
+
+def get_catalog():
+    """
+    @brief Return the catalog of this worker process.
+    @return Catalog snapshot.
+    """
+    return catalog_cache.get(current_app.config.get("CATALOG_VERSION_POLL_SECONDS", 1.0))
+
+def catalog_fields_changed(item):
+    """
+    @brief Tell whether a flushed change to an item or veggie price touches anything kept in the catalog.
+    @param item Item or pricing row changed in the flush.
+    @return True unless nothing but the stock quantity changed.
+    """
+    changed = {attr.key for attr in inspect(item).attrs if attr.history.has_changes()}
+    return bool(changed - {"stock_quantity"})
+
+@event.listens_for(db.session, "after_flush")
+def bump_on_item_change(session, flush_context):
+    # Items and veggie prices added, changed or deleted through the ORM change the catalog, unless only
+    # the stock of an item changed
+    for instance in session.new | session.dirty | session.deleted:
+        if isinstance(instance, (Item, WeightPricing, PackPricing, UnitPricing)) and (instance not in session.dirty or catalog_fields_changed(instance)):
+            bump_catalog_version(session)
+            return
+
+@event.listens_for(db.session, "after_commit")
+def revalidate_after_commit(session):
+    # This worker sees its own catalog changes at once, the others on their next poll
+    if session.info.pop("catalog_changed", False):
+        catalog_cache.invalidate()
+
+@event.listens_for(db.session, "after_rollback")
+def forget_rolled_back_change(session):
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,50 @@
+"""
+@file
+@brief This module provides conditional GET (ETag / If-None-Match) support for the listing pages.
+@details A page's ETag is derived from a cheap version stamp of the data it shows together with
+         everything else that changes its content (route, query string and logged-in user),
+         so an unchanged page is answered with 304 before its listing queries run or its
+         template is rendered.
+"""
+
+import hashlib
+from flask import Response, make_response, request, session
+from metrics import record_cache
+
+def page_etag(*stamp):
+    """
+    @brief Build the strong ETag of the current page.
+    @param stamp Values that change whenever the data shown on the page changes.
+    @return ETag value, without quotes.
+    """
+    parts = (request.endpoint, request.query_string.decode(), session.get('user_id'), session.get('user_type')) + stamp
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+def _revalidate(response, etag):
+    response.set_etag(etag)
+    # The page depends on the user, and browsers have to check it is current before every use
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag):
+    """
+    @brief Answer the request with 304 if the client already has the current page.
+    @param etag ETag of the current page.
+    @return 304 response, or None if the page has to be rendered.
+    """
+    # Flashed messages are shown once on the next rendered page, which then differs from any cached copy
+    if '_flashes' in session or not request.if_none_match.contains(etag):
+        record_cache("conditional_get", False)
+        return None
+    record_cache("conditional_get", True)
+    return _revalidate(Response(status=304), etag)
+
+def tagged(body, etag):
+    """
+    @brief Turn a rendered page into a response carrying its ETag.
+    @param body Rendered page.
+    @param etag ETag of the page.
+    @return Response.
+    """
+    return _revalidate(make_response(body), etag)
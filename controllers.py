@@ -1,10 +1,28 @@
-from flask import render_template, request, redirect, url_for, flash, session, Response
-from models import Person, Staff, Customer, CorporateCustomer, Order, OrderLine, Item, Payment, CreditCardPayment, DebitCardPayment, PremadeBox, WeightedVeggie, PackVeggie, UnitPriceVeggie
+from flask import render_template, request, redirect, url_for, flash, session, g, Response, stream_with_context, jsonify
+from models import Person, Customer, CorporateCustomer, Order, OrderLine, Payment, CreditCardPayment, DebitCardPayment
+from inventory import price_line, reserve_stock, stock_levels
+from catalog import get_catalog
+from identity import load_principal, load_customer, remember
+from order_numbers import next_order_number, next_payment_id
+from pagination import keyset_paginate, id_paginate
+from exports import stream_customer_csv, gzip_stream
+from reporting import customer_type_of, record_sale, total_sales_since, record_items_sold, top_items
+from conditional import page_etag, not_modified, tagged
+from database import pool_metrics
+from replica import read_from_replica
+from query_stats import worst_requests
+from metrics import orders_placed, record_payment
 from datetime import datetime, timedelta
 from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 
+# Length in days of the report time frames
+REPORT_DAYS = {'weekly': 7, 'monthly': 30, 'yearly': 365}
+
 def setup_routes(app, db):
+    # Resolve the logged-in user into g.principal before every request
+    app.before_request(load_principal)
+
     # Home Page
     @app.route("/")
     def home():
@@ -21,13 +39,8 @@ def setup_routes(app, db):
             # Check if the credentials match an existing user
             person = Person.query.filter_by(username=username, password=password).first()
             if person:
-                # Store user information in session
-                session['user_id'] = person.id
-                # Determine user type (staff or customer)
-                if Staff.query.filter_by(id=person.id).first():
-                    session['user_type'] = 'staff'
-                elif Customer.query.filter_by(id=person.id).first():
-                    session['user_type'] = 'customer'
+                # Store the user's id, role (staff or customer) and profile in the session
+                remember(person)
                 flash("Logged in successfully!", "success")
                 return redirect(url_for("dashboard"))
             else:
@@ -50,9 +63,8 @@ def setup_routes(app, db):
         if 'user_id' not in session:
             flash("Please log in to access the dashboard.", "danger")
             return redirect(url_for("login"))
-        # Get the user details from the session
-        user = Person.query.get(session['user_id'])
-        return render_template("dashboard.html", user=user)
+        # The user details come from the profile kept in the session
+        return render_template("dashboard.html", user=g.principal)
 
     # View Available Vegetables and Boxes
     @app.route("/vegetables")
@@ -60,9 +72,16 @@ def setup_routes(app, db):
         if 'user_id' not in session:
             flash("Please log in to access the dashboard.", "danger")
             return redirect(url_for("login"))
-        # Fetch only items that are either vegetables or boxes
-        items = Item.query.filter(Item.type.in_(['Veggie', 'Box'])).all()
-        return render_template("vegetables.html", items=items)
+        # Show only items that are either vegetables or boxes, from the cached catalog
+        catalog = get_catalog()
+        # Stock changes with every order, so it is read live rather than cached with the catalog
+        stock = stock_levels([item.id for item in catalog.listed_items])
+        # The page only changes with the catalog and the stock, so browsers holding the current page get a 304
+        etag = page_etag(catalog.version, sorted(stock.items()))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        return tagged(render_template("vegetables.html", items=catalog.listed_items, stock=stock), etag)
 
     # Place Order Functionality
     @app.route("/place_order", methods=["GET", "POST"])
@@ -81,16 +100,15 @@ def setup_routes(app, db):
             if request.method == "POST" and "customer_id" in request.form:
                 # Allow staff to select a customer to place order for
                 customer_id = int(request.form.get("customer_id"))
-                customer = Customer.query.get(customer_id)
+                customer = load_customer(customer_id)
             elif request.method == "GET":
                 # Staff accessing order page for the first time, show all customers
-                return render_template("place_order.html", available_items=Item.query.all(), customer=None, staff=True, all_customers=Customer.query.all())
+                return render_template("place_order.html", available_items=get_catalog().items, customer=None, staff=True, all_customers=Customer.query.all())
             staff = True
             staff_id = user_id
         else:
             # If the logged-in user is a customer, they can only order for themselves
-            customer_id = user_id
-            customer = Customer.query.get(customer_id)
+            customer = g.principal.customer
             staff = False
 
         # Redirect if customer not found
@@ -98,10 +116,12 @@ def setup_routes(app, db):
             flash("You need to be a customer to place an order or select a customer to place an order on their behalf.", "danger")
             return redirect(url_for("dashboard"))
 
-        available_items = Item.query.filter(Item.type.in_(['Veggie'])).all()
+        # Take the veggies with all their pricing from the cached catalog
+        catalog = get_catalog()
+        available_items = list(catalog.veggies.values())
 
         # Check for corporate customers and their credit limit
-        corp_customer = CorporateCustomer.query.filter_by(id=customer.id).first()
+        corp_customer = customer if isinstance(customer, CorporateCustomer) else None
         if corp_customer:
             if customer.cust_balance < corp_customer.max_credit:
                 flash("Corporate customers cannot place orders if their balance is less than their credit limit.", "danger")
@@ -124,44 +144,31 @@ def setup_routes(app, db):
                 if num_of_boxes > 0:
                     premade_box_price = 10.0 if box_size == 'Small' else 15.0 if box_size == 'Medium' else 20.0
                     total_price += premade_box_price * num_of_boxes
-                    premade_box = PremadeBox.query.filter_by(box_size=box_size).first()
+                    premade_box = catalog.boxes.get(box_size)
                     if not premade_box:
                         flash("The selected box size is not available.", "danger")
                         return redirect(url_for("place_order"))
-                    order_lines.append(OrderLine(item_number=premade_box.id, quantity=num_of_boxes))
+                    order_lines.append({"item_number": premade_box.id, "quantity": num_of_boxes, "order_type": None})
 
-                # Handle Individual Vegetable Orders
+                # Handle Individual Vegetable Orders, priced from the catalog
                 with db.session.no_autoflush:
                     for item in available_items:
                         order_type = request.form.get(f"order_type_{item.id}")
                         quantity = request.form.get(f"order_{item.id}", 0, type=int)
-                        quantity_ordered = quantity
                         if quantity > 0:
                             # Calculate based on order type (unit, weight, or pack)
-                            if order_type == 'unit':
-                                unit_veggie = UnitPriceVeggie.query.get(item.id)
-                                total_price += unit_veggie.price_per_unit * quantity
-                                quantity_ordered = unit_veggie.quantity * quantity
-                            elif order_type == 'weight':
-                                weight_veggie = WeightedVeggie.query.get(item.id)
-                                total_price += weight_veggie.weight_per_kilo * quantity
-                                quantity_ordered = weight_veggie.weight * quantity
-                            elif order_type == 'pack':
-                                pack_veggie = PackVeggie.query.get(item.id)
-                                total_price += pack_veggie.price_per_pack * quantity
-                                quantity_ordered = pack_veggie.num_of_pack * quantity
-                            else:
-                                total_price += item.price * quantity
-
-                            # Stock Check
-                            if item.stock_quantity < quantity_ordered:
-                                flash(f"Item {item.name} does not have enough stock. Available: {item.stock_quantity}", "danger")
+                            line_price, quantity_ordered = price_line(item, order_type, quantity)
+                            total_price += line_price
+
+                            # Reserve stock with a conditional update so concurrent orders cannot oversell
+                            if not reserve_stock(item.id, quantity_ordered):
+                                # Report the stock the reservation was refused against, not the catalog's
+                                available = stock_levels([item.id]).get(item.id, 0)
+                                db.session.rollback()
+                                flash(f"Item {item.name} does not have enough stock. Available: {available}", "danger")
                                 return redirect(url_for("place_order"))
 
-                            # Update item stock
-                            item.stock_quantity -= quantity_ordered
-                            db.session.add(item)
-                            order_lines.append(OrderLine(item_number=item.id, quantity=quantity, order_type=order_type))
+                            order_lines.append({"item_number": item.id, "quantity": quantity, "order_type": order_type})
 
                 # Apply discount for corporate customers
                 if corp_customer:
@@ -174,7 +181,7 @@ def setup_routes(app, db):
                     total_price += delivery_fee
 
                 # Create new order
-                order_number = "ORD" + str(int(datetime.now().timestamp()))
+                order_number = next_order_number()
                 new_order = Order(
                     order_customer=customer.id, 
                     staff_id=staff_id, 
@@ -183,13 +190,18 @@ def setup_routes(app, db):
                     order_status="Pending", 
                     total_amount=total_price)
                 db.session.add(new_order)
+                # Flush to get the order id without ending the transaction holding the stock reservations
+                db.session.flush()
+
+                # Add all order lines with a single bulk insert, then commit everything at once
+                if order_lines:
+                    for order_line in order_lines:
+                        order_line["order_id"] = new_order.id
+                    db.session.execute(OrderLine.__table__.insert(), order_lines)
+                # Count the items sold towards the popular items of the day
+                record_items_sold(new_order.order_date, order_lines)
                 db.session.commit()
-
-                # Add order lines to the order
-                for order_line in order_lines:
-                    order_line.order_id = new_order.id
-                    db.session.add(order_line)
-                db.session.commit()
+                orders_placed.labels("staff" if staff else "customer").inc()
 
                 flash(f"Order placed successfully! Total price: ${total_price:.2f}. You can proceed to payment now or later from your orders page.", "success")
                 return redirect(url_for("checkout", order_id=new_order.id))
@@ -219,7 +231,7 @@ def setup_routes(app, db):
         if request.method == "POST":
             payment_method = request.form.get("payment_method")
             payment_amount = float(request.form.get("payment_amount", 0))
-            payment_id = order.order_number
+            payment_id = next_payment_id()
             new_payment = None
 
             try:
@@ -260,11 +272,14 @@ def setup_routes(app, db):
                         )
                         db.session.add(customer)
                     else:
+                        record_payment(payment_method, "insufficient_balance")
                         flash("Insufficient account balance.", "danger")
                         return redirect(url_for("checkout", order_id=order.id))
 
                 if new_payment:
                     db.session.add(new_payment)
+                    # Add the payment to the daily sales rollup in the same transaction
+                    record_sale(new_payment.payment_date, new_payment.payment_method, customer_type_of(order.order_customer), payment_amount)
                     db.session.commit()
                     
                     # Update order status if fully paid
@@ -273,12 +288,15 @@ def setup_routes(app, db):
                         order.order_status = "Completed"
                     
                     db.session.commit()
+                    record_payment(payment_method, "succeeded")
                     flash("Payment successful! Order completed.", "success")
                     return redirect(url_for("my_orders", order_id=order.id))
                 else:
+                    record_payment(payment_method, "invalid_method")
                     flash("Invalid payment method.", "danger")
             except Exception as e:
                 db.session.rollback()
+                record_payment(payment_method, "error")
                 flash(f"An error occurred during payment: {str(e)}", "danger")
                 return redirect(url_for("checkout", order_id=order.id))
 
@@ -292,9 +310,8 @@ def setup_routes(app, db):
             return redirect(url_for('login'))
 
         user_id = session['user_id']
-        customer = Customer.query.get(user_id)
 
-        if not customer:
+        if not g.principal.is_customer:
             flash("You need to be a customer to view your orders.", "danger")
             return redirect(url_for('dashboard'))
 
@@ -307,42 +324,84 @@ def setup_routes(app, db):
             .options(joinedload(Order.order_lines).joinedload(OrderLine.item)).all()
         )
 
+        # Fetch the payments of all orders at once and keep the first payment of each order
+        first_payments = {}
+        if orders:
+            payments = Payment.query.filter(Payment.order_id.in_([order.id for order in orders])).order_by(Payment.id).all()
+            for payment in payments:
+                first_payments.setdefault(payment.order_id, payment)
+
         order_details = []
         for order in orders:
-            order_lines = OrderLine.query.filter_by(order_id=order.id).all()
-            payment = Payment.query.filter_by(order_id=order.id).first()
-            person = Person.query.get(order.order_customer)
+            # Loaded once and then taken from the session's identity map for the customer's other orders
+            person = order.customer
             customer_name = f"{person.first_name} {person.last_name}" if person else None
             order_details.append({
                 'order': order,
-                'order_lines': order_lines,
-                'payment': payment,
+                'order_lines': order.order_lines,
+                'payment': first_payments.get(order.id),
                 'customer_name': customer_name
             })
         
         return render_template('my_orders.html', orders=order_details)
 
+    # Restrict orders to the ones the logged-in user may see
+    def visible_orders(orders):
+        # Customers only see their own orders
+        if session['user_type'] == 'customer':
+            orders = orders.filter_by(order_customer=session['user_id'])
+        return orders
+
+    # Version stamp of an order listing, which changes whenever one of its orders is placed, updated or deleted,
+    # or the name of one of their customers changes
+    def orders_stamp(orders):
+        count, last_id, last_update, last_customer_update = (
+            orders.join(Person, Person.id == Order.order_customer)
+            .with_entities(func.count(Order.id), func.max(Order.id), func.max(Order.updated_at), func.max(Person.updated_at))
+            .one())
+        return count, last_id, str(last_update), str(last_customer_update)
+
+    # Fetch one page of orders, newest first, with the customer names loaded in the same query
+    def paginate_orders(orders):
+        orders = orders.options(joinedload(Order.customer))
+        per_page = min(max(request.args.get("per_page", app.config['ORDERS_PER_PAGE'], type=int), 1), app.config['ORDERS_MAX_PER_PAGE'])
+        try:
+            page, next_cursor = keyset_paginate(orders, Order.order_date, Order.id, request.args.get("after"), per_page)
+        except ValueError:
+            # Start again from the first page if the cursor was tampered with
+            page, next_cursor = keyset_paginate(orders, Order.order_date, Order.id, None, per_page)
+        return page, next_cursor, per_page
+
     # View Current Orders (Pending)
     @app.route("/current_orders")
     def view_current_orders():
         if 'user_id' not in session:
             flash("Please log in to view orders.", "danger")
             return redirect(url_for("login"))
-        orders = Order.query.filter_by(order_status='Pending')
-        # Customers only see their own pending orders
-        orders = orders.filter_by(order_customer=session['user_id']).all() if session['user_type'] == 'customer' else orders.all()
-        return render_template("current_orders.html", orders=orders)
+        orders = visible_orders(Order.query.filter_by(order_status='Pending'))
+        # Answer browsers that already have the current listing before querying and rendering it
+        etag = page_etag(*orders_stamp(orders))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        orders, next_cursor, per_page = paginate_orders(orders)
+        return tagged(render_template("current_orders.html", orders=orders, next_cursor=next_cursor, per_page=per_page), etag)
 
     # View Previous Orders (Completed)
     @app.route("/previous_orders")
+    @read_from_replica
     def view_previous_orders():
         if 'user_id' not in session:
             flash("Please log in to view orders.", "danger")
             return redirect(url_for("login"))
-        orders = Order.query.filter(Order.order_status != 'Pending')
-        # Customers only see their own completed orders
-        orders = orders.filter_by(order_customer=session['user_id']).all() if session['user_type'] == 'customer' else orders.all()
-        return render_template("previous_orders.html", orders=orders)
+        orders = visible_orders(Order.query.filter(Order.order_status != 'Pending'))
+        # Answer browsers that already have the current listing before querying and rendering it
+        etag = page_etag(*orders_stamp(orders))
+        unchanged = not_modified(etag)
+        if unchanged:
+            return unchanged
+        orders, next_cursor, per_page = paginate_orders(orders)
+        return tagged(render_template("previous_orders.html", orders=orders, next_cursor=next_cursor, per_page=per_page), etag)
 
     # Cancel Pending Order (Customer Only)
     @app.route("/cancel_order/<int:order_id>", methods=["POST"])
@@ -355,6 +414,8 @@ def setup_routes(app, db):
             order = Order.query.get(order_id)
             # Only allow cancellation if the order is pending and belongs to the user
             if order and order.order_status == 'Pending' and order.order_customer == session['user_id']:
+                # Take the items back out of the popular items counters
+                record_items_sold(order.order_date, order.order_lines, sign=-1)
                 # Delete associated OrderLine records before deleting the order
                 OrderLine.query.filter_by(order_id=order.id).delete()
                 db.session.delete(order)
@@ -374,7 +435,7 @@ def setup_routes(app, db):
         if 'user_id' not in session:
             flash("Please log in to view your orders.", "danger")
             return redirect(url_for('login'))
-        customer = Customer.query.get(session['user_id'])
+        customer = g.principal.customer
         return render_template("customer_details.html", customer=customer)
 
     # Update Order Status (Staff Only)
@@ -386,7 +447,13 @@ def setup_routes(app, db):
         order = Order.query.get(order_id)
         if order:
             # Update the order status based on staff input
-            order.order_status = request.form.get("order_status")
+            new_status = request.form.get("order_status")
+            # Keep the popular items counters in step with orders being cancelled or reinstated
+            if new_status == 'Cancelled' and order.order_status != 'Cancelled':
+                record_items_sold(order.order_date, order.order_lines, sign=-1)
+            elif order.order_status == 'Cancelled' and new_status != 'Cancelled':
+                record_items_sold(order.order_date, order.order_lines)
+            order.order_status = new_status
             db.session.commit()
             flash("Order status updated successfully.", "success")
         else:
@@ -395,87 +462,93 @@ def setup_routes(app, db):
     
     # View All Customers (Staff Only)
     @app.route("/customers", methods=["GET"])
+    @read_from_replica
     def view_customers():
         if 'user_id' not in session or session['user_type'] != 'staff':
             flash("Access denied. You need to be a staff member to view this page.", "danger")
             return redirect(url_for("login"))
 
-        # Fetch all customers
-        customers = Customer.query.all()
-        customer_details = []
-        for customer in customers:
-            # Determine customer type (corporate or private)
-            customer_type = "Corporate" if CorporateCustomer.query.filter_by(id=customer.id).first() else "Private"
-            customer_details.append({
-                "customer": customer,
-                "type": customer_type
-            })
-        return render_template("view_customers.html", customers=customer_details)
+        # Fetch one page of customers with only the displayed columns, telling corporate and
+        # private customers apart by their discriminator
+        customers = db.session.query(
+            Customer.id, Customer.username, Customer.first_name, Customer.last_name,
+            Customer.cust_address, Customer.cust_balance,
+            (Customer.person_type == 'corporate_customer').label("is_corporate"),
+        )
+        per_page = min(max(request.args.get("per_page", app.config['CUSTOMERS_PER_PAGE'], type=int), 1), app.config['CUSTOMERS_MAX_PER_PAGE'])
+        customers, next_after = id_paginate(customers, Customer.id, request.args.get("after", type=int), per_page)
+        customer_details = [{"customer": customer, "type": "Corporate" if customer.is_corporate else "Private"} for customer in customers]
+        return render_template("view_customers.html", customers=customer_details, next_after=next_after, per_page=per_page)
 
     # Generate Customer List as CSV (Staff Only)
     @app.route("/generate_customer_list", methods=["GET"])
+    @read_from_replica
     def generate_customer_list():
         if 'user_id' not in session or session['user_type'] != 'staff':
             flash("Access denied. You need to be a staff member to view this page.", "danger")
             return redirect(url_for("login"))
 
-        # Create a CSV response for all customers
-        customers = Customer.query.all()
-        def generate():
-            yield "Customer ID,First Name,Last Name,Address,Balance\n"
-            for customer in customers:
-                yield f"{customer.id},{customer.first_name},{customer.last_name},{customer.cust_address},{customer.cust_balance}\n"
-
-        return Response(generate(), mimetype='text/csv', headers={"Content-Disposition": "attachment;filename=customer_list.csv"})
+        # Stream the CSV response for all customers in chunks, optionally gzip compressed
+        chunks = stream_customer_csv(app.config['CSV_EXPORT_CHUNK_SIZE'])
+        if request.args.get("compress") == "gzip":
+            return Response(stream_with_context(gzip_stream(chunks)), mimetype='application/gzip', headers={"Content-Disposition": "attachment;filename=customer_list.csv.gz"})
+        return Response(stream_with_context(chunks), mimetype='text/csv', headers={"Content-Disposition": "attachment;filename=customer_list.csv"})
     
     # Generate Sales Report (Staff Only)
     @app.route("/generate_report", methods=["GET", "POST"])
+    @read_from_replica
     def generate_report():
         if 'user_id' not in session or session['user_type'] != 'staff':
             flash("Access denied. You need to be a staff member to view this page.", "danger")
             return redirect(url_for("login"))
 
         report_type = request.form.get('report_type', 'weekly') if request.method == "POST" else 'weekly'
+        if report_type not in REPORT_DAYS:
+            report_type = 'weekly'
         # Determine the start date based on report type
-        start_date = datetime.now() - timedelta(weeks=1) if report_type == 'weekly' else datetime.now() - timedelta(days=30 if report_type == 'monthly' else 365)
-
-        # Calculate total sales for the given time frame
-        total_sales = db.session.query(func.sum(Payment.payment_amount)).filter(Payment.payment_date >= start_date).scalar() or 0
-
-        # Fetch the top 5 most popular items
-        # Query to determine the most popular items based on the number of order lines
-        most_popular_items = (
-            db.session.query(Item.name, func.count(OrderLine.item_number))
-            # Join OrderLine to determine how many times each item has been ordered
-            .join(OrderLine)
-            # Group the results by item ID to aggregate counts per item
-            .group_by(Item.id)
-            # Order the results by the count of each item's appearances in descending order
-            .order_by(func.count(OrderLine.item_number).desc())
-            # Limit the results to the top 10 most popular items
-            .limit(5)
-            .all()
-        )
+        start_date = datetime.now() - timedelta(days=REPORT_DAYS[report_type])
+
+        # Calculate total sales for the given time frame from the daily sales rollup
+        total_sales = total_sales_since(start_date)
+
+        # Fetch the top 5 most popular items of the same time frame from the per item daily counters
+        most_popular_items = top_items(REPORT_DAYS[report_type], 5)
         return render_template("report.html", report_type=report_type, total_sales=total_sales, most_popular_items=most_popular_items)
     
     # View Most Popular Items (Staff Only)
     @app.route("/popular_items", methods=["GET"])
+    @read_from_replica
     def view_popular_items():
         if 'user_id' not in session or session['user_type'] != 'staff':
             flash("Access denied. You need to be a staff member to view this page.", "danger")
             return redirect(url_for("login"))
 
-        # Query to determine the most popular items based on the number of order lines
-        most_popular_items = (
-            db.session.query(Item.name, func.count(OrderLine.item_number))
-            # Join OrderLine to determine how many times each item has been ordered
-            .join(OrderLine)
-            # Group the results by item ID to aggregate counts per item
-            .group_by(Item.id)
-            # Order the results by the count of each item's appearances in descending order
-            .order_by(func.count(OrderLine.item_number).desc())
-            # Limit the results to the top 10 most popular items
-            .limit(10)
-            .all()
-        )
-        return render_template("popular_items.html", most_popular_items=most_popular_items)
+        # Fetch the top 10 most popular items of the selected time frame from the per item daily counters
+        days = request.args.get("days", 30, type=int)
+        if days not in REPORT_DAYS.values():
+            days = 30
+        most_popular_items = top_items(days, 10)
+        return render_template("popular_items.html", most_popular_items=most_popular_items, days=days)
+
+    # Connection Pool Metrics of this Worker (Staff Only)
+    @app.route("/pool_status", methods=["GET"])
+    def pool_status():
+        if 'user_id' not in session or session['user_type'] != 'staff':
+            flash("Access denied. You need to be a staff member to view this page.", "danger")
+            return redirect(url_for("login"))
+
+        # Checkouts, waits and timeouts of the pool since the worker started, and how many connections are in use
+        return jsonify(pool_metrics.snapshot(db.engine.pool))
+
+    # Worst Recent Requests of this Worker by Database Use (Staff Only)
+    @app.route("/debug/requests", methods=["GET"])
+    def debug_requests():
+        if 'user_id' not in session or session['user_type'] != 'staff':
+            flash("Access denied. You need to be a staff member to view this page.", "danger")
+            return redirect(url_for("login"))
+
+        # Sort by database time, statement count or total duration
+        sort = request.args.get("sort", "db_time_ms")
+        if sort not in ("db_time_ms", "query_count", "duration_ms"):
+            sort = "db_time_ms"
+        return render_template("debug_requests.html", recent_requests=worst_requests(sort, 50), sort=sort)
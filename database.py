@@ -0,0 +1,119 @@
+"""
+@file
+@brief This module provides the connection pool of the database engine and its metrics.
+@details The engine is built with MeteredQueuePool, a QueuePool recording how often connections
+         are checked out, how long requests wait for one, how many waits time out and how many
+         connections are invalidated (e.g. after "MySQL server has gone away"). Together with the
+         occupancy of the pool, these tell whether the pool is sized right for the worker count.
+         Connections to SQLite are set up by configure_sqlite, so the app behaves the same on
+         SQLite as on MySQL.
+"""
+
+import sqlite3
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+class PoolMetrics:
+    """
+    @brief Thread-safe counters of the connection pools of one worker process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        @brief Set every counter back to zero.
+        """
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.invalidations = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+
+    def record_checkout(self, waited, timed_out=False):
+        """
+        @brief Record one request for a connection.
+        @param waited Seconds spent waiting for the connection.
+        @param timed_out True if no connection became free within the pool timeout.
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def record_invalidation(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool=None):
+        """
+        @brief Read the counters, together with the occupancy of a pool.
+        @param pool Pool whose occupancy to include, if any.
+        @return Dictionary of metric names and values.
+        """
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        return stats
+
+pool_metrics = PoolMetrics()
+
+class MeteredQueuePool(QueuePool):
+    """
+    @brief QueuePool recording its checkouts and waits into pool_metrics.
+    """
+
+    def _do_get(self):
+        # This is where QueuePool blocks while every connection is in use
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+@event.listens_for(MeteredQueuePool, "invalidate")
+def count_invalidation(dbapi_connection, connection_record, exception):
+    pool_metrics.record_invalidation()
+
+@event.listens_for(Engine, "connect")
+def configure_sqlite(dbapi_connection, connection_record):
+    """
+    @brief Set up every new SQLite connection like a MySQL one.
+    @details Foreign keys are enforced, which SQLite only does when asked on each connection. A file
+             database is switched to write-ahead logging, so readers do not block the writer nor the
+             writer the readers, and commits only sync the log at checkpoints. An in-memory
+             database keeps its own journal.
+    @param dbapi_connection New DBAPI connection.
+    @param connection_record Pool record of the connection.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.close()
@@ -0,0 +1,316 @@
+"""
+@file
+@brief This module generates large, realistic datasets for load and scaling tests.
+@details Customers (private and corporate), staff, items of every kind, orders with their lines,
+         and the credit card, debit card and account payments of the orders are written with
+         bulk inserts of whole batches of rows, table by table down the joined-table hierarchy,
+         so tens of millions of rows load in minutes. Primary keys are assigned up front, after
+         the highest ids already in the tables, and the discriminator columns (person_type,
+         item_type, payment_type) are set so the rows load as their concrete classes.
+         The data is skewed the way a shop's is: a few items and customers account for most
+         order lines, recent days have more orders than old ones, corporate customers mostly pay
+         on account, and the orders of the last days are still pending.
+         Run it with `flask --app main:Initialize_app generate-dataset --help`, against a
+         database nobody else writes to while it runs.
+"""
+
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from random import Random
+import click
+from sqlalchemy import func, insert, select
+from catalog import bump_catalog_version
+from models import (db, Person, Staff, Customer, CorporateCustomer, Item, Veggie, WeightPricing, PackPricing,
+                    UnitPricing, PremadeBox, Order, OrderLine, Payment, CreditCardPayment, DebitCardPayment)
+from reporting import backfill_daily_sales, backfill_item_sales
+
+# Password of every generated user
+PASSWORD = "123"
+# Share of the customers that are corporate customers
+CORPORATE_SHARE = 0.1
+# Kinds of items generated, with their share of the items and the order type of their order lines;
+# every vegetable is generated with a single way of pricing
+ITEM_KINDS = (("weighted_veggie", 0.3, "weight"), ("pack_veggie", 0.3, "pack"),
+              ("unit_price_veggie", 0.3, "unit"), ("premade_box", 0.1, None))
+# Prices of the premade boxes, as charged by place_order
+BOX_PRICES = {"Small": 10.0, "Medium": 15.0, "Large": 20.0}
+# Number of lines of an order, and how often orders have that many lines
+LINES_PER_ORDER = ((1, 2, 3, 4, 5, 6, 8), (30, 25, 18, 12, 8, 5, 2))
+# Payment methods, and how often private and corporate customers use them
+PAYMENT_METHODS = ("Credit Card", "Debit Card", "Account")
+PRIVATE_PAYMENT_WEIGHTS = (55, 40, 5)
+CORPORATE_PAYMENT_WEIGHTS = (15, 10, 75)
+
+class Skewed:
+    """
+    @brief Picks values with Zipf distributed popularity: the value of rank r is picked in proportion to 1 / r ** exponent.
+    """
+
+    def __init__(self, values, exponent, random):
+        self.values = list(values)
+        self.cum_weights = list(accumulate(1.0 / rank ** exponent for rank in range(1, len(self.values) + 1)))
+        self.random = random
+
+    def pick(self, k=1):
+        return self.random.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+def next_ids(connection, model, count):
+    """
+    @brief Reserve ids for new rows of a table, after the highest id it holds.
+    @param connection Connection to read the highest id with.
+    @param model Model class of the table (the base class of a hierarchy).
+    @param count Number of ids needed.
+    @return Range of the ids.
+    """
+    table = model.__table__
+    start = (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+    return range(start, start + count)
+
+def relax_checks(connection, relaxed):
+    """
+    @brief Skip the foreign key and unique checks of MySQL on the connection while loading.
+    @details The generated rows are consistent by construction; the checks cost a lookup per row.
+    @param connection Connection of the load.
+    @param relaxed True to skip the checks, False to restore them.
+    """
+    if connection.dialect.name == "mysql":
+        value = 0 if relaxed else 1
+        connection.exec_driver_sql(f"SET SESSION foreign_key_checks = {value}, unique_checks = {value}")
+
+def bulk_insert(connection, rows_by_table):
+    """
+    @brief Insert batches of rows, one multi-row insert per table, parents before children.
+    @param connection Connection of the load.
+    @param rows_by_table List of (model class, list of row dictionaries) tuples, in insert order.
+    @return Number of rows inserted.
+    """
+    inserted = 0
+    for model, rows in rows_by_table:
+        if rows:
+            connection.execute(insert(model.__table__), rows)
+            inserted += len(rows)
+    return inserted
+
+def person_rows(ids, kind, random):
+    """
+    @brief Generate staff members or customers.
+    @param ids Ids of the persons.
+    @param kind 'staff' or 'customer'; every tenth customer or so is a corporate customer.
+    @param random Random number generator.
+    @return List of (model class, rows) tuples, and the list of (id, corporate) tuples of the customers.
+    """
+    persons, staff, customers, corporate_customers, generated = [], [], [], [], []
+    for id in ids:
+        if kind == "staff":
+            persons.append(dict(id=id, first_name="Staff", last_name=f"Member {id}", username=f"gen_staff_{id}",
+                                password=PASSWORD, person_type="staff"))
+            staff.append(dict(id=id, date_joined=datetime.now().date() - timedelta(days=random.randrange(3650)),
+                              dept_name=random.choice(("Sales", "Warehouse", "Delivery")), staff_id=f"GS{id}"))
+            continue
+        corporate = random.random() < CORPORATE_SHARE
+        distance = round(random.uniform(0.5, 40.0), 1)
+        persons.append(dict(id=id, first_name="Customer", last_name=f"Number {id}", username=f"gen_customer_{id}",
+                            password=PASSWORD, person_type="corporate_customer" if corporate else "customer"))
+        customers.append(dict(id=id, cust_address=f"{id} Market St", cust_balance=round(random.uniform(0, 500), 2),
+                              cust_id=f"GC{id}", max_owing=100.0, distance_from_store=distance))
+        if corporate:
+            corporate_customers.append(dict(id=id, discount_rate=0.1, max_credit=10000.0, min_balance=1000.0,
+                                            distance_from_store=distance))
+        generated.append((id, corporate))
+    return [(Person, persons), (Staff, staff), (Customer, customers), (CorporateCustomer, corporate_customers)], generated
+
+def item_rows(ids, staff_ids, random):
+    """
+    @brief Generate items of every kind.
+    @param ids Ids of the items.
+    @param staff_ids Ids of the staff members adding the items.
+    @param random Random number generator.
+    @return List of (model class, rows) tuples, and the list of (id, order type, price per quantity) tuples of the items.
+    """
+    tables = {model: [] for model in (Item, Veggie, WeightPricing, PackPricing, UnitPricing, PremadeBox)}
+    generated = []
+    kinds = [kind for kind, share, order_type in ITEM_KINDS]
+    shares = [share for kind, share, order_type in ITEM_KINDS]
+    order_types = {kind: order_type for kind, share, order_type in ITEM_KINDS}
+    for id in ids:
+        kind = random.choices(kinds, shares)[0]
+        price = round(random.uniform(0.5, 10.0), 2)
+        staff_id = random.choice(staff_ids)
+        if kind == "premade_box":
+            box_size = random.choice(tuple(BOX_PRICES))
+            tables[Item].append(dict(id=id, name=f"{box_size} Box {id}", description="Box of seasonal vegetables",
+                                     price=BOX_PRICES[box_size], type="Box", stock_quantity=random.randrange(10, 500),
+                                     item_type=kind))
+            tables[PremadeBox].append(dict(id=id, box_size=box_size, num_of_boxes=random.randrange(10, 500),
+                                           staff_id=staff_id))
+            generated.append((id, None, BOX_PRICES[box_size]))
+            continue
+        name = f"Vegetable {id}"
+        tables[Item].append(dict(id=id, name=name, description=f"Fresh {name.lower()}", price=price, type="Veggie",
+                                 stock_quantity=random.randrange(100, 100000), item_type="veggie"))
+        tables[Veggie].append(dict(id=id, veg_name=name, staff_id=staff_id))
+        if kind == "weighted_veggie":
+            tables[WeightPricing].append(dict(id=id, weight=1.0, weight_per_kilo=price))
+        elif kind == "pack_veggie":
+            tables[PackPricing].append(dict(id=id, num_of_pack=random.choice((4, 6, 10)), price_per_pack=round(price * 4, 2)))
+            price = round(price * 4, 2)
+        else:
+            tables[UnitPricing].append(dict(id=id, price_per_unit=price, quantity=1))
+        generated.append((id, order_types[kind], price))
+    return list(tables.items()), generated
+
+def order_rows(order_ids, first_line_id, first_payment_id, customers, items, staff_ids, days, now, random):
+    """
+    @brief Generate orders with their lines and payments.
+    @details Completed orders are paid in full, some in two payments; pending orders are unpaid or partly
+             paid, and cancelled orders unpaid.
+    @param order_ids Ids of the orders.
+    @param first_line_id Id of the first order line.
+    @param first_payment_id Id of the first payment.
+    @param customers Skewed picker of (customer id, corporate) tuples.
+    @param items Skewed picker of (item id, order type, price per quantity) tuples.
+    @param staff_ids Ids of the staff members placing orders for customers.
+    @param days Number of days back the orders go.
+    @param now Date and time of the most recent order.
+    @param random Random number generator.
+    @return List of (model class, rows) tuples.
+    """
+    orders, lines, payments, credit_card_payments, debit_card_payments = [], [], [], [], []
+    line_id, payment_id = first_line_id, first_payment_id
+    for order_id in order_ids:
+        customer_id, corporate = customers.pick()[0]
+        # Business grows: recent days have more orders than older ones
+        age = timedelta(seconds=days * 86400 * random.random() ** 1.5)
+        order_date = now - age
+        if age < timedelta(days=2):
+            status = random.choices(("Pending", "Completed"), (70, 30))[0]
+        else:
+            status = random.choices(("Completed", "Cancelled", "Pending"), (93, 5, 2))[0]
+
+        total = 0.0
+        ordered = {}
+        for item_id, order_type, price in items.pick(random.choices(*LINES_PER_ORDER)[0]):
+            ordered.setdefault(item_id, (order_type, price, random.randrange(1, 6)))
+        for item_id, (order_type, price, quantity) in ordered.items():
+            lines.append(dict(id=line_id, item_number=item_id, order_id=order_id, quantity=quantity,
+                              order_type=order_type))
+            line_id += 1
+            total += price * quantity
+        if corporate:
+            total *= 0.9
+
+        # Paid in full, in one or two payments, partly paid or not paid at all
+        if status == "Completed":
+            amounts = [total] if random.random() < 0.8 else [round(total / 2, 2), total - round(total / 2, 2)]
+        elif status == "Pending" and random.random() < 0.3:
+            amounts = [round(total / 2, 2)]
+        else:
+            amounts = []
+        updated_at = order_date
+        for amount in amounts:
+            paid_at = min(updated_at + timedelta(minutes=random.randrange(1, 4320)), now)
+            method = random.choices(PAYMENT_METHODS, CORPORATE_PAYMENT_WEIGHTS if corporate else PRIVATE_PAYMENT_WEIGHTS)[0]
+            payment_type = {"Credit Card": "credit_card_payment", "Debit Card": "debit_card_payment"}.get(method, "payment")
+            payments.append(dict(id=payment_id, payment_amount=round(amount, 2), payment_date=paid_at,
+                                 payment_method=method, payment_id=f"PAYG{payment_id:018d}", customer_id=customer_id,
+                                 order_id=order_id, payment_type=payment_type))
+            card_number = f"{random.randrange(10 ** 15, 10 ** 16)}"
+            if method == "Credit Card":
+                credit_card_payments.append(dict(id=payment_id, card_number=card_number,
+                                                 card_expiry_date=f"{random.randrange(1, 13):02d}/{random.randrange(27, 32)}",
+                                                 card_type=random.choice(("Visa", "Mastercard", "Amex"))))
+            elif method == "Debit Card":
+                debit_card_payments.append(dict(id=payment_id, debit_card_number=card_number,
+                                                bank_name=random.choice(("First Bank", "City Bank", "Union Bank"))))
+            payment_id += 1
+            updated_at = paid_at
+
+        orders.append(dict(id=order_id, order_customer=customer_id,
+                           staff_id=random.choice(staff_ids) if random.random() < 0.05 else None,
+                           order_date=order_date, order_number=f"ORDG{order_id:018d}", order_status=status,
+                           total_amount=round(total, 2), updated_at=updated_at))
+    return [(Order, orders), (OrderLine, lines), (Payment, payments),
+            (CreditCardPayment, credit_card_payments), (DebitCardPayment, debit_card_payments)]
+
+def generate_dataset(customers=1000, staff=10, items=500, orders=10000, days=365, batch_size=5000, seed=None,
+                     progress=None):
+    """
+    @brief Add a generated dataset to the database, then rebuild the sales rollups and bump the catalog version.
+    @param customers Number of customers.
+    @param staff Number of staff members.
+    @param items Number of items.
+    @param orders Number of orders; order lines are about 2.5 and payments about 1 per order.
+    @param days Number of days back the orders go.
+    @param batch_size Number of orders written per transaction.
+    @param seed Seed of the random numbers, to generate the same data again.
+    @param progress Function called with (rows inserted so far, orders inserted so far) after every batch.
+    @return Number of rows inserted into every table, by table name.
+    """
+    random = Random(seed)
+    counts = {}
+
+    def load(connection, rows_by_table):
+        bulk_insert(connection, rows_by_table)
+        for model, rows in rows_by_table:
+            counts[model.__tablename__] = counts.get(model.__tablename__, 0) + len(rows)
+        connection.commit()
+
+    with db.engine.connect() as connection:
+        relax_checks(connection, True)
+        try:
+            rows_by_table, _ = person_rows(next_ids(connection, Person, staff), "staff", random)
+            load(connection, rows_by_table)
+            staff_ids = [row["id"] for row in rows_by_table[1][1]]
+            rows_by_table, generated_customers = person_rows(next_ids(connection, Person, customers), "customer", random)
+            load(connection, rows_by_table)
+            rows_by_table, generated_items = item_rows(next_ids(connection, Item, items), staff_ids, random)
+            load(connection, rows_by_table)
+
+            # Which customers and items are the popular ones is random too
+            random.shuffle(generated_customers)
+            random.shuffle(generated_items)
+            customer_picker = Skewed(generated_customers, 0.8, random)
+            item_picker = Skewed(generated_items, 1.1, random)
+            now = datetime.now()
+            order_ids = next_ids(connection, Order, orders)
+            line_id = next_ids(connection, OrderLine, 1).start
+            payment_id = next_ids(connection, Payment, 1).start
+            for start in range(0, orders, batch_size):
+                rows_by_table = order_rows(order_ids[start:start + batch_size], line_id, payment_id, customer_picker,
+                                           item_picker, staff_ids, days, now, random)
+                load(connection, rows_by_table)
+                line_id += len(rows_by_table[1][1])
+                payment_id += len(rows_by_table[2][1])
+                if progress:
+                    progress(sum(counts.values()), counts["orders"])
+        finally:
+            relax_checks(connection, False)
+
+    # The rollups and the catalog are derived from the rows written above
+    backfill_daily_sales()
+    backfill_item_sales()
+    bump_catalog_version()
+    db.session.commit()
+    return counts
+
+@click.command("generate-dataset")
+@click.option("--customers", default=1000, show_default=True, type=click.IntRange(min=1), help="Customers to add, about a tenth of them corporate.")
+@click.option("--staff", default=10, show_default=True, type=click.IntRange(min=1), help="Staff members to add.")
+@click.option("--items", default=500, show_default=True, type=click.IntRange(min=1), help="Items to add, across every kind of vegetable and box.")
+@click.option("--orders", default=10000, show_default=True, type=click.IntRange(min=0), help="Orders to add, with their lines and payments.")
+@click.option("--days", default=365, show_default=True, help="Days back the orders go.")
+@click.option("--batch-size", default=5000, show_default=True, type=click.IntRange(min=1), help="Orders written per transaction.")
+@click.option("--seed", default=None, type=int, help="Seed of the random numbers, to generate the same data again.")
+def generate_dataset_command(customers, staff, items, orders, days, batch_size, seed):
+    """Add a large generated dataset to the database."""
+    started = time.perf_counter()
+
+    def progress(rows, orders_done):
+        elapsed = time.perf_counter() - started
+        click.echo(f"{orders_done}/{orders} orders, {rows} rows, {rows / elapsed:.0f} rows/s")
+
+    counts = generate_dataset(customers, staff, items, orders, days, batch_size, seed, progress)
+    for table, rows in counts.items():
+        click.echo(f"{table:<24}{rows:>12}")
+    click.echo(f"{sum(counts.values())} rows in {time.perf_counter() - started:.1f}s")
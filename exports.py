@@ -0,0 +1,49 @@
+"""
+@file
+@brief This module streams the CSV exports offered to staff.
+"""
+
+import csv
+import io
+import zlib
+from sqlalchemy import select
+from models import db, Customer
+
+CUSTOMER_LIST_HEADER = ["Customer ID", "First Name", "Last Name", "Address", "Balance"]
+
+def stream_customer_csv(chunk_size):
+    """
+    @brief Stream the customer list as CSV text.
+    @details Only the exported columns are selected and rows are fetched from a server-side cursor
+             chunk_size at a time, so memory use stays flat however many customers there are.
+    @param chunk_size Number of rows fetched from the database and written per yielded chunk.
+    @return Generator of CSV text chunks, starting with the header line.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CUSTOMER_LIST_HEADER)
+    yield buffer.getvalue()
+
+    rows = db.session.execute(
+        select(Customer.id, Customer.first_name, Customer.last_name, Customer.cust_address, Customer.cust_balance)
+        .order_by(Customer.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for partition in rows.partitions():
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(partition)
+        yield buffer.getvalue()
+
+def gzip_stream(chunks):
+    """
+    @brief Compress a stream of text chunks into a gzip stream.
+    @param chunks Iterable of text chunks.
+    @return Generator of gzip compressed byte chunks.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
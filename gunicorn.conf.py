@@ -0,0 +1,26 @@
+# Settings of gunicorn, read when it is started from the project folder: `gunicorn wsgi:app`
+# The number of workers comes from WEB_CONCURRENCY, or `gunicorn --workers N`
+import itertools
+import os
+
+# Build the app once in the master process; the workers are forked with it ready, and wsgi.py makes
+# each of them open database connections of its own
+preload_app = True
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+
+def pre_fork(server, worker):
+    # Give the new worker the lowest index no live worker of this node has, in the master before it forks
+    taken = {getattr(live, 'order_worker_index', None) for live in server.WORKERS.values()}
+    worker.order_worker_index = next(index for index in itertools.count() if index not in taken)
+
+def post_fork(server, worker):
+    # Derive the worker id of the order numbers from ORDER_NODE_ID and the index of the worker, and start a
+    # generator of its own; a worker whose id cannot be unique fails to boot
+    from order_numbers import assign_worker_index
+    assign_worker_index(worker.order_worker_index)
+
+def child_exit(server, worker):
+    # Forget the live gauges of a stopped worker, when PROMETHEUS_MULTIPROC_DIR collects the metrics of every worker
+    from metrics import worker_exit
+    worker_exit(worker.pid)
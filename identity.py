@@ -0,0 +1,118 @@
+"""
+@file
+@brief This module resolves the logged-in user of each request.
+@details The role and a compact profile of the user are kept in the session at login, so most
+         requests know who is logged in without any query. Only the credit fields, which
+         change as orders are paid, are read from the database, at most once per request.
+"""
+
+from flask import g, session
+from sqlalchemy import select
+from sqlalchemy.orm import with_polymorphic
+from models import db, Person, Staff, Customer, CorporateCustomer
+
+def profile_of(person):
+    """
+    @brief Build the profile of a person stored in the session.
+    @param person Person loaded as its concrete class.
+    @return Dictionary with the id, names, role and corporate flag of the person.
+    """
+    role = 'staff' if isinstance(person, Staff) else 'customer' if isinstance(person, Customer) else None
+    return {
+        'id': person.id,
+        'username': person.username,
+        'first_name': person.first_name,
+        'last_name': person.last_name,
+        'role': role,
+        'is_corporate': isinstance(person, CorporateCustomer),
+    }
+
+def load_customer(customer_id):
+    """
+    @brief Load a customer, with the credit fields of a corporate customer, in a single query.
+    @param customer_id Id of the customer.
+    @return Customer or CorporateCustomer, or None if there is no such customer.
+    """
+    customer = with_polymorphic(Customer, [CorporateCustomer])
+    return db.session.execute(select(customer).where(customer.id == customer_id)).scalar_one_or_none()
+
+def remember(person):
+    """
+    @brief Store the identity of a person who has just logged in in the session.
+    @param person Person loaded as its concrete class.
+    """
+    profile = profile_of(person)
+    # Server-side sessions move to a new id at login, so an id planted before it cannot be used after it
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
+    session['user_id'] = person.id
+    if profile['role']:
+        session['user_type'] = profile['role']
+    session['profile'] = profile
+
+class Principal:
+    """
+    @brief The logged-in user of the current request.
+    """
+
+    def __init__(self, profile):
+        """
+        @brief Create the principal from the profile kept in the session.
+        @param profile Dictionary built by profile_of.
+        """
+        self.id = profile['id']
+        self.username = profile['username']
+        self.first_name = profile['first_name']
+        self.last_name = profile['last_name']
+        self.role = profile['role']
+        self.is_corporate = profile['is_corporate']
+        self._customer = None
+
+    @property
+    def is_staff(self):
+        return self.role == 'staff'
+
+    @property
+    def is_customer(self):
+        return self.role == 'customer'
+
+    @property
+    def customer(self):
+        """
+        @brief The Customer (or CorporateCustomer) row of the principal, loaded once per request.
+        @return Customer, or None if the principal is not a customer.
+        """
+        if self._customer is None and self.is_customer:
+            self._customer = load_customer(self.id)
+        return self._customer
+
+    @property
+    def cust_balance(self):
+        return self.customer.cust_balance if self.customer else None
+
+    @property
+    def max_owing(self):
+        return self.customer.max_owing if self.customer else None
+
+    @property
+    def max_credit(self):
+        return self.customer.max_credit if self.is_corporate and self.customer else None
+
+def load_principal():
+    """
+    @brief Resolve the logged-in user into g.principal before every request.
+    @details Sessions created before profiles were stored are upgraded with one query;
+             sessions of users that no longer exist are cleared.
+    """
+    g.principal = None
+    if 'user_id' not in session:
+        return
+    profile = session.get('profile')
+    if profile is None or profile['id'] != session['user_id']:
+        person = db.session.get(Person, session['user_id'])
+        if person is None:
+            session.clear()
+            return
+        remember(person)
+        profile = session['profile']
+    g.principal = Principal(profile)
@@ -0,0 +1,61 @@
+"""
+@file
+@brief This module provides the inventory helpers used when pricing and stocking orders.
+"""
+
+from sqlalchemy import select, update
+from models import db, Item
+
+def price_line(item, order_type, quantity):
+    """
+    @brief Calculate the price and stock usage of one order line.
+    @param item Catalog item of the ordered vegetable, see catalog.CatalogItem.
+    @param order_type 'unit', 'weight', 'pack' or anything else for the plain item price.
+    @param quantity Number of units, kilos or packs ordered.
+    @return Tuple of (line price, stock quantity consumed).
+    @throws ValueError If the item is not sold by the requested order type.
+    """
+    if order_type == 'unit':
+        if item.price_per_unit is None:
+            raise ValueError(f"Item {item.name} is not sold by unit.")
+        return item.price_per_unit * quantity, item.unit_quantity * quantity
+    elif order_type == 'weight':
+        if item.weight_per_kilo is None:
+            raise ValueError(f"Item {item.name} is not sold by weight.")
+        return item.weight_per_kilo * quantity, item.weight * quantity
+    elif order_type == 'pack':
+        if item.price_per_pack is None:
+            raise ValueError(f"Item {item.name} is not sold by pack.")
+        return item.price_per_pack * quantity, item.num_of_pack * quantity
+    return item.price * quantity, quantity
+
+def reserve_stock(item_id, quantity):
+    """
+    @brief Atomically take stock for an order line.
+    @details The check and the decrement happen in one conditional UPDATE, so concurrent
+             orders for the same item can never oversell it without any table lock or
+             read-then-write round trip. Stock is not part of the cached catalog, so reserving
+             it leaves the catalog version alone.
+    @param item_id Id of the item to reserve stock from.
+    @param quantity Stock quantity to reserve.
+    @return True if the stock was reserved, False if there was not enough stock.
+    """
+    items = Item.__table__
+    result = db.session.execute(
+        update(items)
+        .where(items.c.id == item_id, items.c.stock_quantity >= quantity)
+        .values(stock_quantity=items.c.stock_quantity - quantity)
+    )
+    return result.rowcount == 1
+
+def stock_levels(item_ids):
+    """
+    @brief Read the current stock of some items in one query.
+    @details Stock changes with every order, so it is read live instead of being kept in the
+             cached catalog, whose version would otherwise change on every sale.
+    @param item_ids Ids of the items.
+    @return Dictionary of item id to stock quantity.
+    """
+    items = Item.__table__
+    rows = db.session.execute(select(items.c.id, items.c.stock_quantity).where(items.c.id.in_(item_ids)))
+    return dict(rows.all())
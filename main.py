@@ -1,17 +1,52 @@
+import os
+from flask_migrate import Migrate, upgrade  # Schema migrations, run with `flask --app main:Initialize_app db upgrade`
 from models import db  # Import the SQLAlchemy database instance
 from controllers import setup_routes  # Import the setup_routes function to register all the routes
 from app import create_app
+from config import in_memory_database
+from reporting import backfill_daily_sales_command, backfill_item_sales_command
+from sessions import init_sessions, sweep_sessions_command
+from replica import init_read_replica
+from query_stats import init_query_stats
+from metrics import init_metrics
+from benchmark import benchmark_command
+from dataset import generate_dataset_command
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
 # Function to create and configure the Flask app
-def Initialize_app():
-    # Instantiate a Flask application object
-    app = create_app()
+def Initialize_app(profile=None):
+    # Instantiate a Flask application object with the settings of the given profile, or of APP_ENV
+    app = create_app(profile)
         
     db.init_app(app)
 
-    # Register database tables by creating all models
-    with app.app_context():
-        db.create_all()  # Creates tables for all defined models in the database if they do not already exist
+    # Record the statements of every request; registered first, so the queries of the other request hooks count
+    init_query_stats(app)
+
+    # Count and time every request for Prometheus, and serve the metrics at /metrics
+    init_metrics(app)
+
+    # Monitor the read replica, if REPLICA_DATABASE_URL configures one
+    init_read_replica(app)
+
+    # Keep sessions in the backend selected by SESSION_BACKEND, shared by every worker unless it is 'memory'
+    init_sessions(app)
+
+    # Register schema migrations; the schema is created and upgraded by the migrations in `migrations/`,
+    # not at startup, so booting the app does no schema work
+    Migrate(app, db)
+    # Except for an in-memory SQLite database, which only lives as long as the process and starts out empty
+    if in_memory_database(app.config['SQLALCHEMY_DATABASE_URI']):
+        with app.app_context():
+            upgrade(directory=MIGRATIONS_DIR)
+
+    # Register maintenance commands, e.g. `flask --app main:Initialize_app backfill-daily-sales`
+    app.cli.add_command(backfill_daily_sales_command)
+    app.cli.add_command(backfill_item_sales_command)
+    app.cli.add_command(sweep_sessions_command)
+    app.cli.add_command(benchmark_command)
+    app.cli.add_command(generate_dataset_command)
 
     # Register the routes defined in the controllers module
     # The `setup_routes` function is responsible for registering all necessary routes with the app instance
@@ -0,0 +1,135 @@
+"""
+@file
+@brief This module collects the Prometheus metrics of the application and serves them at /metrics.
+@details The counters, histograms and gauges of prometheus_client are thread-safe. When several
+         worker processes serve the app, set PROMETHEUS_MULTIPROC_DIR to an empty directory
+         shared by the workers before they start: every worker then keeps its values in mmap'd
+         files in that directory, and /metrics, whichever worker serves it, adds all of them up.
+         Call worker_exit from the child_exit hook of gunicorn, so the gauges of a worker that
+         has stopped are no longer counted. Only logged-in staff and requests carrying the
+         METRICS_TOKEN bearer token may read /metrics.
+"""
+
+import hmac
+import os
+import time
+from flask import Response, g, request, session
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy.pool import QueuePool
+from models import db
+
+# Methods labelled as themselves; any other method a client makes up is labelled "other"
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+http_requests = Counter(
+    "http_requests_total", "Requests served, by endpoint, method and status.", ["endpoint", "method", "status"])
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time taken to serve requests, by endpoint and method.", ["endpoint", "method"])
+http_request_errors = Counter(
+    "http_request_errors_total", "Requests failing with a server error, by endpoint and method.", ["endpoint", "method"])
+
+db_pool_size = Gauge(
+    "db_pool_size", "Connections the pools keep open.", multiprocess_mode="livesum")
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections of the pools in use.", multiprocess_mode="livesum")
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Connections opened beyond the pool size.", multiprocess_mode="livesum")
+
+orders_placed = Counter(
+    "orders_placed_total", "Orders placed, by who placed them.", ["placed_by"])
+payments = Counter(
+    "payments_total", "Payment attempts, by payment method and outcome.", ["method", "outcome"])
+cache_requests = Counter(
+    "cache_requests_total", "Cache lookups, by cache and result ('hit' or 'miss').", ["cache", "result"])
+
+# Payment methods offered at checkout; anything else a client sends is counted as 'other'
+PAYMENT_METHODS = ("Credit Card", "Debit Card", "Account")
+
+def record_payment(method, outcome):
+    """
+    @brief Count a payment attempt.
+    @param method Payment method chosen by the customer.
+    @param outcome 'succeeded', 'insufficient_balance', 'invalid_method' or 'error'.
+    """
+    payments.labels(method if method in PAYMENT_METHODS else "other", outcome).inc()
+
+def record_cache(cache, hit):
+    """
+    @brief Count a cache lookup.
+    @param cache Name of the cache.
+    @param hit True if the lookup was answered from the cache.
+    """
+    cache_requests.labels(cache, "hit" if hit else "miss").inc()
+
+def render_metrics():
+    """
+    @brief Render the metrics in the Prometheus text format.
+    @return Metrics of this process, or of every worker in multiprocess mode.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+def metrics_allowed(token):
+    """
+    @brief Tell whether the current request may read the metrics.
+    @param token Bearer token of the scraper, None if only staff may read the metrics.
+    @return True for a request carrying the token, or from a logged-in staff member.
+    """
+    authorization = request.authorization
+    if token and authorization is not None and authorization.type == "bearer":
+        return hmac.compare_digest((authorization.token or "").encode(), token.encode())
+    return session.get("user_type") == "staff"
+
+def worker_exit(pid):
+    """
+    @brief Forget the live gauges of a stopped worker, e.g. `def child_exit(server, worker): worker_exit(worker.pid)`.
+    @param pid Process id of the worker.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+def init_metrics(app):
+    """
+    @brief Measure every request of the app, and serve the metrics at /metrics.
+    @param app Flask application.
+    """
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exception):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        # Requests matching no route share one label, so unknown paths cannot grow the number of series
+        endpoint = request.endpoint or "unmatched"
+        method = request.method if request.method in HTTP_METHODS else "other"
+        status = 500 if exception is not None else g.pop("metrics_status", 500)
+        http_requests.labels(endpoint, method, str(status)).inc()
+        http_request_duration.labels(endpoint, method).observe(time.perf_counter() - started)
+        if status >= 500:
+            http_request_errors.labels(endpoint, method).inc()
+        pool = db.engine.pool
+        if isinstance(pool, QueuePool):
+            db_pool_size.set(pool.size())
+            db_pool_checked_out.set(pool.checkedout())
+            db_pool_overflow.set(max(pool.overflow(), 0))
+
+    @app.route("/metrics")
+    def metrics():
+        # The metrics name every route and show the traffic of the shop, so they are not public
+        if not metrics_allowed(app.config.get("METRICS_TOKEN")):
+            return Response("Forbidden\n", status=403, mimetype="text/plain")
+        return Response(render_metrics(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,38 @@
+"""Veggie pricing rows
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+# Pricing tables of the veggies and the identities revision 0007 gave the veggies priced one way only
+VEGGIE_SUBCLASSES = [
+    ('weighted_veggies', 'weighted_veggie'),
+    ('pack_veggies', 'pack_veggie'),
+    ('unit_price_veggies', 'unit_price_veggie'),
+]
+
+
+def upgrade():
+    # The pricing tables now hold optional rows of a veggie rather than subclasses of it, so a veggie
+    # sold several ways loads like any other
+    op.execute("UPDATE items SET item_type = 'veggie' WHERE id IN (SELECT id FROM veggies)")
+
+
+def downgrade():
+    for subclass_table, identity in VEGGIE_SUBCLASSES:
+        other_tables = " UNION ".join(f"SELECT id FROM {other}" for other, _ in VEGGIE_SUBCLASSES if other != subclass_table)
+        op.execute(
+            f"UPDATE items SET item_type = '{identity}' "
+            f"WHERE id IN (SELECT id FROM {subclass_table}) AND id IN (SELECT id FROM veggies) "
+            f"AND id NOT IN ({other_tables})"
+        )
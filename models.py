@@ -4,13 +4,13 @@
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
 from datetime import datetime
-from flask import Flask
-from app import create_app
+from replica import RoutingSession
 
-app = create_app()
-
-db = SQLAlchemy(app)
+# Bound to an app by main.Initialize_app, so importing the models builds no app and opens no connection
+# Sessions read from the replica in the routes marked read_from_replica
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Person(db.Model):
     """
@@ -24,6 +24,17 @@ class Person(db.Model):
     last_name = db.Column(db.String(100), nullable=False)
     password = db.Column(db.String(100), nullable=False)
     username = db.Column(db.String(100), unique=True, nullable=False)
+    # Concrete class of the person, so queries return Staff, Customer or CorporateCustomer directly
+    person_type = db.Column(db.String(50), nullable=False, server_default='person')
+    # Last time the person was changed, part of the version stamp of the order listings showing their name
+    updated_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'),
+                           default=datetime.now, onupdate=datetime.now)
+
+    # Lookups return the concrete class; queries that need the columns of a subclass load them with_polymorphic
+    __mapper_args__ = {
+        'polymorphic_on': person_type,
+        'polymorphic_identity': 'person',
+    }
 
 class Staff(Person):
     """
@@ -31,6 +42,7 @@ class Staff(Person):
     @details Extends the Person model with staff-specific attributes and relationships.
     """
     __tablename__ = 'staff'
+    __mapper_args__ = {'polymorphic_identity': 'staff'}
 
     id = db.Column(db.Integer, db.ForeignKey('persons.id'), primary_key=True)
     date_joined = db.Column(db.Date, default=datetime.now)
@@ -48,6 +60,7 @@ class Customer(Person):
     @details Extends the Person model with customer-specific attributes and relationships.
     """
     __tablename__ = 'customers'
+    __mapper_args__ = {'polymorphic_identity': 'customer'}
 
     id = db.Column(db.Integer, db.ForeignKey('persons.id'), primary_key=True)
     cust_address = db.Column(db.String(255), nullable=False)
@@ -65,6 +78,7 @@ class CorporateCustomer(Customer):
     @details Extends the Customer model with corporate-specific attributes.
     """
     __tablename__ = 'corporate_customers'
+    __mapper_args__ = {'polymorphic_identity': 'corporate_customer'}
 
     id = db.Column(db.Integer, db.ForeignKey('customers.id'), primary_key=True)
     discount_rate = db.Column(db.Float, default=0.05)
@@ -86,22 +100,36 @@ class Item(db.Model):
     price = db.Column(db.Float)
     type = db.Column(db.String(50))
     stock_quantity = db.Column(db.Integer)
+    # Concrete class of the item; type above is the shop category ('Veggie' or 'Box')
+    item_type = db.Column(db.String(50), nullable=False, server_default='item')
+
+    __mapper_args__ = {
+        'polymorphic_on': item_type,
+        'polymorphic_identity': 'item',
+    }
 
 class Veggie(Item):
     """
     @brief Model representing a vegetable item.
-    @details Extends the Item model with vegetable-specific attributes.
+    @details Extends the Item model with vegetable-specific attributes. A vegetable can be sold by
+             weight, by pack and by unit at the same time, so each of these has its own optional
+             pricing row rather than a subclass of its own.
     """
     __tablename__ = 'veggies'
+    __mapper_args__ = {'polymorphic_identity': 'veggie'}
 
     id = db.Column(db.Integer, db.ForeignKey('items.id'), primary_key=True)
     veg_name = db.Column(db.String(100), nullable=False)
     staff_id = db.Column(db.Integer, db.ForeignKey('staff.id'), nullable=True)
 
-class WeightedVeggie(Veggie):
+    weight_pricing = db.relationship('WeightPricing', uselist=False, cascade='all, delete-orphan', backref='veggie')
+    pack_pricing = db.relationship('PackPricing', uselist=False, cascade='all, delete-orphan', backref='veggie')
+    unit_pricing = db.relationship('UnitPricing', uselist=False, cascade='all, delete-orphan', backref='veggie')
+
+class WeightPricing(db.Model):
     """
-    @brief Model representing a weighted vegetable item.
-    @details Extends the Veggie model with weight-specific attributes.
+    @brief Model representing the price of a vegetable sold by weight.
+    @details Defines the weight sold and the price per kilo of one vegetable.
     """
     __tablename__ = 'weighted_veggies'
 
@@ -109,10 +137,10 @@ class WeightedVeggie(Veggie):
     weight = db.Column(db.Float, nullable=False)
     weight_per_kilo = db.Column(db.Float, nullable=False)
 
-class PackVeggie(Veggie):
+class PackPricing(db.Model):
     """
-    @brief Model representing a packaged vegetable item.
-    @details Extends the Veggie model with package-specific attributes.
+    @brief Model representing the price of a vegetable sold by pack.
+    @details Defines the number of packs and the price per pack of one vegetable.
     """
     __tablename__ = 'pack_veggies'
 
@@ -120,10 +148,10 @@ class PackVeggie(Veggie):
     num_of_pack = db.Column(db.Integer, nullable=False)
     price_per_pack = db.Column(db.Float, nullable=False)
 
-class UnitPriceVeggie(Veggie):
+class UnitPricing(db.Model):
     """
-    @brief Model representing a vegetable sold by unit price.
-    @details Extends the Veggie model with unit-specific attributes.
+    @brief Model representing the price of a vegetable sold by unit.
+    @details Defines the unit price and the quantity per unit of one vegetable.
     """
     __tablename__ = 'unit_price_veggies'
 
@@ -137,6 +165,7 @@ class PremadeBox(Item):
     @details Extends the Item model with box-specific attributes and methods.
     """
     __tablename__ = 'premade_boxes'
+    __mapper_args__ = {'polymorphic_identity': 'premade_box'}
 
     id = db.Column(db.Integer, db.ForeignKey('items.id'), primary_key=True)
     box_size = db.Column(db.String(50), nullable=False)  # 'Small', 'Medium', 'Large'
@@ -166,14 +195,23 @@ class Order(db.Model):
     @details Defines attributes and relationships for customer orders.
     """
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Customer order listings filter on status and customer and sort by date
+        db.Index('ix_orders_status_customer_date', 'order_status', 'order_customer', 'order_date'),
+        # Staff order listings filter on status only and sort by date
+        db.Index('ix_orders_status_date', 'order_status', 'order_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_customer = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
     staff_id = db.Column(db.Integer, db.ForeignKey('staff.id'), nullable=True)
-    order_date = db.Column(db.DateTime, default=datetime.now)
+    order_date = db.Column(db.DateTime, nullable=False, default=datetime.now)
     order_number = db.Column(db.String(100), unique=True, nullable=False)
     order_status = db.Column(db.String(50), nullable=False)  # 'Pending', 'Completed', etc.
     total_amount = db.Column(db.Float, nullable=False)
+    # Last time the order was changed, part of the version stamp of the order listings
+    updated_at = db.Column(db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql'),
+                           default=datetime.now, onupdate=datetime.now)
 
     order_lines = db.relationship('OrderLine', backref='order', lazy=True)
     payments = db.relationship('Payment', backref='order', lazy=True)
@@ -186,8 +224,8 @@ class OrderLine(db.Model):
     __tablename__ = 'order_lines'
 
     id = db.Column(db.Integer, primary_key=True)
-    item_number = db.Column(db.Integer, db.ForeignKey('items.id'), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    item_number = db.Column(db.Integer, db.ForeignKey('items.id'), nullable=False, index=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     order_type = db.Column(db.String(50))
 
@@ -202,11 +240,18 @@ class Payment(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     payment_amount = db.Column(db.Float, nullable=False)
-    payment_date = db.Column(db.DateTime, default=datetime.now)
+    payment_date = db.Column(db.DateTime, default=datetime.now, index=True)
     payment_method = db.Column(db.String(50), nullable=False)
     payment_id = db.Column(db.String(100), unique=True, nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    # Concrete class of the payment, independent of the payment method entered
+    payment_type = db.Column(db.String(50), nullable=False, server_default='payment')
+
+    __mapper_args__ = {
+        'polymorphic_on': payment_type,
+        'polymorphic_identity': 'payment',
+    }
 
 class CreditCardPayment(Payment):
     """
@@ -214,6 +259,7 @@ class CreditCardPayment(Payment):
     @details Extends the Payment model with credit card-specific attributes.
     """
     __tablename__ = 'credit_card_payments'
+    __mapper_args__ = {'polymorphic_identity': 'credit_card_payment'}
 
     id = db.Column(db.Integer, db.ForeignKey('payments.id'), primary_key=True)
     card_expiry_date = db.Column(db.String(5), nullable=False)
@@ -226,7 +272,57 @@ class DebitCardPayment(Payment):
     @details Extends the Payment model with debit card-specific attributes.
     """
     __tablename__ = 'debit_card_payments'
+    __mapper_args__ = {'polymorphic_identity': 'debit_card_payment'}
 
     id = db.Column(db.Integer, db.ForeignKey('payments.id'), primary_key=True)
     bank_name = db.Column(db.String(100), nullable=False)
     debit_card_number = db.Column(db.String(16), nullable=False)
+
+class DailySales(db.Model):
+    """
+    @brief Model representing the sales of one day.
+    @details Rollup of the payments table per day, payment method and customer type, maintained
+             incrementally as payments are recorded so sales reports never scan the payments table.
+    """
+    __tablename__ = 'daily_sales'
+
+    sales_date = db.Column(db.Date, primary_key=True)
+    payment_method = db.Column(db.String(50), primary_key=True)
+    customer_type = db.Column(db.String(50), primary_key=True)  # 'Corporate' or 'Private'
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+
+class ItemDailySales(db.Model):
+    """
+    @brief Model representing the quantity of one item sold on one day.
+    @details Counters maintained as orders are placed and cancelled, so the popular items
+             of any recent window are found without scanning the order lines.
+    """
+    __tablename__ = 'item_daily_sales'
+
+    sales_date = db.Column(db.Date, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id'), primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+
+class CatalogVersion(db.Model):
+    """
+    @brief Model holding the version number of the item catalog.
+    @details A single row whose version is increased whenever items or prices change,
+             so every worker process can tell cheaply whether its cached catalog is still current.
+    """
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=1)
+
+class ServerSession(db.Model):
+    """
+    @brief Model representing one session kept on the server.
+    @details Used by the 'database' session backend, so every worker and node sees the same sessions;
+             the session cookie only carries the signed session id.
+    """
+    __tablename__ = 'server_sessions'
+
+    sid = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)  # Session contents, serialized like the session cookie
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,153 @@
+"""
+@file
+@brief This module generates unique, sortable order numbers and payment ids without a database round trip.
+"""
+
+import os
+import threading
+import time
+
+class SnowflakeGenerator:
+    """
+    @brief Snowflake-style id generator.
+    @details Each id packs the milliseconds since a custom epoch, a worker id and a per-millisecond
+             sequence number, so ids from different workers never collide and sort by creation time.
+    """
+    EPOCH_MS = 1704067200000  # 2024-01-01 00:00:00 UTC
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+    def __init__(self, worker_id, clock=time.time):
+        """
+        @brief Create a generator for one worker.
+        @param worker_id Id between 0 and MAX_WORKER_ID, unique among all running workers.
+        @param clock Function returning the current time in seconds.
+        """
+        if not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ValueError(f"Worker id must be between 0 and {self.MAX_WORKER_ID}.")
+        self.worker_id = worker_id
+        self.clock = clock
+        self.last_timestamp = -1
+        self.sequence = 0
+        self.lock = threading.Lock()
+
+    def _now(self):
+        return int(self.clock() * 1000) - self.EPOCH_MS
+
+    def next_id(self):
+        """
+        @brief Generate the next id.
+        @return Positive integer id, unique for this worker and strictly increasing.
+        """
+        with self.lock:
+            # Never go backwards if the system clock is adjusted
+            timestamp = max(self._now(), self.last_timestamp)
+            if timestamp == self.last_timestamp:
+                self.sequence = (self.sequence + 1) & self.MAX_SEQUENCE
+                if self.sequence == 0:
+                    # Sequence exhausted for this millisecond, wait for the next one
+                    while timestamp <= self.last_timestamp:
+                        timestamp = self._now()
+            else:
+                self.sequence = 0
+            self.last_timestamp = timestamp
+            return (timestamp << (self.WORKER_BITS + self.SEQUENCE_BITS)) | (self.worker_id << self.SEQUENCE_BITS) | self.sequence
+
+# The worker id of a process is made of the id of its node and of its index among the workers of that node
+NODE_BITS = 5
+INDEX_BITS = SnowflakeGenerator.WORKER_BITS - NODE_BITS
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_WORKER_INDEX = (1 << INDEX_BITS) - 1
+
+_worker_index = None
+_generator = None
+_generator_pid = None
+
+def node_id():
+    """
+    @brief Read the id of this node from the ORDER_NODE_ID environment variable.
+    @details Every node of a multi-node deployment must set a different one; a single node may leave it unset.
+    @return Node id between 0 and MAX_NODE_ID.
+    """
+    value = int(os.environ.get("ORDER_NODE_ID", 0))
+    if not 0 <= value <= MAX_NODE_ID:
+        raise ValueError(f"ORDER_NODE_ID must be between 0 and {MAX_NODE_ID}.")
+    return value
+
+def assign_worker_index(index):
+    """
+    @brief Give the current process its index among the worker processes of its node.
+    @details Call from the post-fork hook of the server, as gunicorn.conf.py does, with an index no other
+             live worker of the node has. The generator is created right away, so a worker whose id
+             cannot be derived fails as it starts rather than on its first order.
+    @param index Index between 0 and MAX_WORKER_INDEX.
+    """
+    global _worker_index, _generator, _generator_pid
+    if not 0 <= index <= MAX_WORKER_INDEX:
+        raise ValueError(f"Worker index must be between 0 and {MAX_WORKER_INDEX}; run at most "
+                         f"{MAX_WORKER_INDEX + 1} workers per node.")
+    _worker_index = (os.getpid(), index)
+    _generator = None
+    _generator_pid = None
+    get_generator()
+
+def default_worker_id():
+    """
+    @brief Derive the worker id of the current process from its node and its index on the node.
+    @details A process that was not given an index is taken as the only one of its node, and gets index 0.
+             That guess would collide in the workers of a server, which all inherit the same environment,
+             so a gunicorn worker, or any process forked from one that generated ids, must have been given
+             an index with assign_worker_index.
+    @return Worker id between 0 and SnowflakeGenerator.MAX_WORKER_ID.
+    @exception RuntimeError The process has no index of its own, and may not be alone on its node.
+    """
+    pid = os.getpid()
+    if _worker_index is not None and _worker_index[0] == pid:
+        index = _worker_index[1]
+    elif os.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn"):
+        raise RuntimeError("This gunicorn worker has no worker index for its order numbers; start gunicorn "
+                           "with gunicorn.conf.py, whose post_fork hook assigns one.")
+    elif _worker_index is not None or (_generator_pid is not None and _generator_pid != pid):
+        raise RuntimeError("This process was forked from one generating order numbers; give it a worker "
+                           "index of its own with assign_worker_index.")
+    else:
+        index = 0
+    return (node_id() << INDEX_BITS) | index
+
+def set_generator(generator):
+    """
+    @brief Replace the generator used for order numbers and payment ids.
+    @param generator Object with a next_id() method, or None to restore the default.
+    """
+    global _generator, _generator_pid
+    _generator = generator
+    _generator_pid = None
+
+def get_generator():
+    """
+    @brief Return the generator for this process, creating the default one on first use.
+    @details A default generator inherited from a parent process is never used, so forked workers never share a worker id.
+    @return The active generator.
+    """
+    global _generator, _generator_pid
+    if _generator is None or (_generator_pid is not None and _generator_pid != os.getpid()):
+        worker_id = default_worker_id()
+        _generator = SnowflakeGenerator(worker_id)
+        _generator_pid = os.getpid()
+    return _generator
+
+def next_order_number():
+    """
+    @brief Generate a new order number.
+    @return Order number such as 'ORD0000123456789012345'.
+    """
+    return f"ORD{get_generator().next_id():019d}"
+
+def next_payment_id():
+    """
+    @brief Generate a new payment id.
+    @return Payment id such as 'PAY0000123456789012345'.
+    """
+    return f"PAY{get_generator().next_id():019d}"
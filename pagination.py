@@ -0,0 +1,72 @@
+"""
+@file
+@brief This module provides keyset (cursor based) pagination for listing queries.
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+def encode_cursor(date_value, id_value):
+    """
+    @brief Encode the position of the last row of a page as an opaque URL-safe cursor.
+    @param date_value Date of the last row.
+    @param id_value Id of the last row.
+    @return Cursor string.
+    """
+    payload = json.dumps([date_value.isoformat(), id_value])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor):
+    """
+    @brief Decode a cursor produced by encode_cursor.
+    @param cursor Cursor string.
+    @return Tuple of (date, id).
+    @throws ValueError If the cursor is malformed.
+    """
+    try:
+        date_value, id_value = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(date_value), int(id_value)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def keyset_paginate(query, date_column, id_column, cursor, page_size):
+    """
+    @brief Fetch one page of a query ordered newest first on (date, id).
+    @details Rows are located by seeking past the cursor instead of using OFFSET, so every page
+             costs the same regardless of how deep into the listing it is.
+    @param query Query to paginate.
+    @param date_column Date column to order by.
+    @param id_column Unique id column used as a tie breaker.
+    @param cursor Cursor of the previous page, or None for the first page.
+    @param page_size Maximum number of rows to return.
+    @return Tuple of (rows, cursor of the next page or None on the last page).
+    """
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        query = query.filter(or_(date_column < last_date, and_(date_column == last_date, id_column < last_id)))
+    rows = query.order_by(date_column.desc(), id_column.desc()).limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(getattr(rows[-1], date_column.key), getattr(rows[-1], id_column.key))
+    return rows, next_cursor
+
+def id_paginate(query, id_column, after_id, page_size):
+    """
+    @brief Fetch one page of a query ordered by ascending id.
+    @param query Query to paginate.
+    @param id_column Unique id column to order and seek on.
+    @param after_id Id of the last row of the previous page, or None for the first page.
+    @param page_size Maximum number of rows to return.
+    @return Tuple of (rows, id to continue after for the next page or None on the last page).
+    """
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    rows = query.order_by(id_column).limit(page_size + 1).all()
+    next_after_id = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_after_id = rows[-1].id
+    return rows, next_after_id
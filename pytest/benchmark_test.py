@@ -0,0 +1,87 @@
+# pytest/benchmark_test.py
+import sys, os
+# Get the parent directory of the current file (benchmark_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+import benchmark
+from sqlalchemy import select
+from models import db, Order, Veggie
+from benchmark import WsgiClient, compare, percentile, run_benchmark, seed_benchmark_data
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, clean_tables):
+    """
+    Pytest fixture to set up the Flask app on the test database, emptied after each test.
+    """
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_percentile():
+    """
+    Test the nearest-rank percentiles of the latencies.
+    """
+    latencies = list(range(1, 101))
+    assert percentile(latencies, 50) == 50
+    assert percentile(latencies, 95) == 95
+    assert percentile(latencies, 99) == 99
+    assert percentile([7], 99) == 7
+
+def test_seeding_is_idempotent(test_app):
+    """
+    Test that seeding twice adds the benchmark data once.
+    """
+    seed_benchmark_data(customers=5, staff=1, items=3)
+    customers, staff = seed_benchmark_data(customers=5, staff=1, items=3)
+    assert len(customers) == 5 and len(staff) == 1
+    assert len(db.session.execute(select(Veggie.id)).all()) == 3
+
+def test_run_drives_every_route(test_app, concurrent_transactions):
+    """
+    Test a small concurrent run against the app: every route is measured, without errors.
+    """
+    customers, staff = seed_benchmark_data(customers=5, staff=1, items=3)
+    item_ids = db.session.execute(select(Veggie.id)).scalars().all()
+    db.session.remove()
+
+    results = run_benchmark(lambda: WsgiClient(test_app), customers, staff, item_ids,
+                            users=2, staff_users=1, iterations=2)
+    routes = results["routes"]
+    assert set(routes) == {"login", "view_vegetables", "place_order", "checkout", "my_orders",
+                           "generate_report", "generate_customer_list"}
+    assert all(figures["errors"] == 0 for figures in routes.values())
+    assert routes["place_order"]["requests"] == 4
+    assert routes["login"]["requests"] == 6
+    assert routes["place_order"]["queries_per_request"] > 0
+    assert routes["generate_customer_list"]["queries_per_request"] > 0
+    assert routes["my_orders"]["p50_ms"] <= routes["my_orders"]["p99_ms"]
+    assert len(db.session.execute(select(Order.id)).all()) == 4
+
+def test_baselines(tmp_path, monkeypatch):
+    """
+    Test that a saved baseline reads back, and that slower routes and extra statements show as regressions.
+    """
+    monkeypatch.setattr(benchmark, "BASELINE_DIR", str(tmp_path))
+    baseline = {"elapsed_s": 1.0, "throughput": 10.0, "routes": {
+        "checkout": {"throughput": 5.0, "p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0, "queries_per_request": 8.0},
+    }}
+    benchmark.save_baseline("main", baseline)
+    assert benchmark.load_baseline("main") == baseline
+
+    slower = {"elapsed_s": 1.0, "throughput": 10.0, "routes": {
+        "checkout": {"throughput": 5.0, "p50_ms": 10.0, "p95_ms": 30.0, "p99_ms": 40.0, "queries_per_request": 9.0},
+    }}
+    regressions = [(route, figure) for route, figure, before, after, regression
+                   in compare(baseline, slower, tolerance=0.2) if regression]
+    assert regressions == [("checkout", "p95_ms"), ("checkout", "queries_per_request")]
+    assert not any(row[-1] for row in compare(baseline, baseline))
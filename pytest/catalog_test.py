@@ -0,0 +1,166 @@
+# pytest/catalog_test.py
+import sys, os
+# Get the parent directory of the current file (catalog_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from sqlalchemy import text
+from models import db, Customer, Staff, Item, Veggie, UnitPricing, WeightPricing, PremadeBox
+from catalog import CatalogCache, get_catalog, current_catalog_version
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, clean_tables, monkeypatch):
+    """
+    Pytest fixture to set up the Flask app on the test database, emptied after each test.
+    """
+    monkeypatch.setitem(app.config, 'CATALOG_VERSION_POLL_SECONDS', 60)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def items(test_app):
+    """
+    Fixture to create a vegetable sold by unit, one sold by weight and a premade box.
+    """
+    staff = Staff(first_name='Alice', last_name='Staff', username='staff', password='123', dept_name='Sales', staff_id='S1')
+    db.session.add(staff)
+    db.session.flush()
+    carrot = Veggie(name='Carrot', price=2.0, type='Veggie', stock_quantity=10, veg_name='Carrot',
+                    staff_id=staff.id, unit_pricing=UnitPricing(price_per_unit=2.0, quantity=1))
+    potato = Veggie(name='Potato', price=4.0, type='Veggie', stock_quantity=50, veg_name='Potato',
+                    staff_id=staff.id, weight_pricing=WeightPricing(weight=1.0, weight_per_kilo=4.0))
+    box = PremadeBox(name='Small Box', price=10.0, type='Box', stock_quantity=5, box_size='Small',
+                     num_of_boxes=1, staff_id=staff.id)
+    db.session.add_all([carrot, potato, box])
+    db.session.commit()
+    return carrot.id, potato.id, box.id
+
+class Clock:
+    """Clock that only moves when told to."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_catalog_contents(items):
+    """
+    Test the catalog holds every item with its subtype pricing.
+    """
+    carrot_id, potato_id, box_id = items
+    catalog = get_catalog()
+    assert catalog.version == current_catalog_version() > 0
+    assert catalog.veggies[carrot_id].price_per_unit == 2.0
+    assert catalog.veggies[potato_id].weight_per_kilo == 4.0
+    assert catalog.boxes['Small'].id == box_id
+    assert [item.id for item in catalog.listed_items] == [carrot_id, potato_id, box_id]
+
+def test_steady_state_reads_cost_no_queries(items, count_queries):
+    """
+    Test that once loaded, the catalog is served without touching the database.
+    """
+    get_catalog()
+    with count_queries() as statements:
+        for _ in range(10):
+            get_catalog()
+    assert statements == []
+
+def test_item_change_invalidates_catalog(items):
+    """
+    Test that changing an item through the ORM is visible to the same worker at once.
+    """
+    carrot_id, potato_id, box_id = items
+    version = get_catalog().version
+    db.session.get(Item, carrot_id).price = 3.0
+    db.session.commit()
+
+    catalog = get_catalog()
+    assert catalog.version == version + 1
+    assert catalog.by_id[carrot_id].price == 3.0
+
+def test_price_change_invalidates_catalog(items):
+    """
+    Test that changing or deleting the pricing row of a veggie is visible to the same worker at once.
+    """
+    carrot_id, potato_id, box_id = items
+    version = get_catalog().version
+    db.session.get(Veggie, carrot_id).unit_pricing.price_per_unit = 9.0
+    db.session.commit()
+
+    catalog = get_catalog()
+    assert catalog.version == version + 1
+    assert catalog.veggies[carrot_id].price_per_unit == 9.0
+
+    db.session.get(Veggie, potato_id).weight_pricing = None
+    db.session.commit()
+    catalog = get_catalog()
+    assert catalog.version == version + 2
+    assert catalog.veggies[potato_id].weight_per_kilo is None
+
+def test_other_workers_poll_the_version(items, count_queries):
+    """
+    Test that a worker reloads its catalog once the poll interval has passed after another worker changed it.
+    """
+    carrot_id, potato_id, box_id = items
+    clock = Clock()
+    worker_cache = CatalogCache(clock=clock)
+    assert worker_cache.get(5).by_id[carrot_id].price == 2.0
+
+    # Another worker changes the price of carrots
+    with db.engine.begin() as connection:
+        connection.execute(text("UPDATE items SET price = 3.0 WHERE id = :id"), {"id": carrot_id})
+        connection.execute(text("UPDATE catalog_version SET version = version + 1"))
+    db.session.commit()
+
+    clock.now = 4
+    assert worker_cache.get(5).by_id[carrot_id].price == 2.0
+    clock.now = 6
+    with count_queries() as statements:
+        assert worker_cache.get(5).by_id[carrot_id].price == 3.0
+    assert len(statements) == 2
+    # An unchanged version costs only the version check
+    clock.now = 12
+    with count_queries() as statements:
+        worker_cache.get(5)
+    assert len(statements) == 1
+
+def test_place_order_leaves_catalog_version(test_app, items):
+    """
+    Test that placing an order changes the stock shown on the vegetables page but not the catalog version.
+    """
+    carrot_id, potato_id, box_id = items
+    customer = Customer(first_name='Bob', last_name='Customer', username='customer', password='123',
+                        cust_address='1 Main St', cust_id='C1', distance_from_store=5.0, max_owing=100.0)
+    db.session.add(customer)
+    db.session.commit()
+    version = current_catalog_version()
+
+    client = test_app.test_client()
+    client.post('/login', data={'username': 'customer', 'password': '123'})
+    response = client.get('/vegetables')
+    assert 'Stock: 10' in response.get_data(as_text=True)
+    client.post('/place_order', data={f'order_{carrot_id}': '3', f'order_type_{carrot_id}': 'unit'})
+    assert current_catalog_version() == version
+    # The stock is read live, so the page and its ETag still change
+    response = client.get('/vegetables', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 200
+    assert 'Stock: 7' in response.get_data(as_text=True)
+
+def test_stock_change_leaves_catalog_version(items):
+    """
+    Test that changing only the stock of an item through the ORM does not change the catalog version.
+    """
+    carrot_id, potato_id, box_id = items
+    version = current_catalog_version()
+    db.session.get(Item, carrot_id).stock_quantity = 20
+    db.session.commit()
+    assert current_catalog_version() == version
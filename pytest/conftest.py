@@ -0,0 +1,140 @@
+# pytest/conftest.py
+"""
+Shared fixtures of the test suite.
+
+The tests run against TEST_DATABASE_URL, by default the MySQL database of the testing profile;
+`TEST_DATABASE_URL=sqlite://` runs them on an in-memory SQLite database, without any server.
+Under pytest-xdist (`pytest -n auto`) every worker gets a database of its own, named after it.
+
+The schema is created once per test session. Tests using db_transaction run inside a transaction
+rolled back when they end, in which the commits of the code under test only release SAVEPOINTs.
+Tests whose code commits through connections of its own (threads, Core connections, other apps)
+use clean_tables instead, which empties every table after the test.
+"""
+import sys, os
+# Get the parent directory of the current file (conftest.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from config import TestingConfig, in_memory_database
+
+def database_url(suffix=None):
+    """
+    Return the URL of the test database of this worker, or of a database set aside next to it.
+    """
+    url = make_url(os.environ.get('TEST_DATABASE_URL') or TestingConfig.SQLALCHEMY_DATABASE_URI)
+    suffixes = [name for name in (os.environ.get('PYTEST_XDIST_WORKER'), suffix) if name]
+    if not suffixes or in_memory_database(url):
+        return url
+    if url.get_backend_name() == 'sqlite':
+        root, extension = os.path.splitext(url.database)
+        return url.set(database=f"{root}_{'_'.join(suffixes)}{extension}")
+    return url.set(database=f"{url.database}_{'_'.join(suffixes)}")
+
+def create_database(url):
+    """
+    Create a MySQL database if it does not exist yet; SQLite creates its databases on first use.
+    """
+    if url.get_backend_name() != 'mysql':
+        return
+    engine = create_engine(url.set(database=''))
+    with engine.connect() as connection:
+        connection.exec_driver_sql(f"CREATE DATABASE IF NOT EXISTS `{url.database}`")
+    engine.dispose()
+
+# Every app built by the tests uses the test database
+os.environ['APP_ENV'] = 'testing'
+os.environ['DATABASE_URL'] = database_url().render_as_string(hide_password=False)
+create_database(database_url())
+
+from models import db
+from catalog import catalog_cache
+from main import Initialize_app
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='session')
+def app():
+    """
+    Pytest fixture building the app shared by the tests, with the schema created once for the session.
+    """
+    app = Initialize_app()
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all(bind_key=None)
+
+@pytest.fixture(scope='function')
+def db_transaction(app):
+    """
+    Pytest fixture running the test in an app context whose session joins a transaction that is rolled
+    back after the test, so whatever the test and its requests commit is gone for the next test.
+    """
+    with app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        if connection.dialect.name == 'sqlite':
+            # The sqlite3 driver only begins a transaction before changing data, so the first SAVEPOINT
+            # would open the outermost one and its RELEASE commit it; begin the transaction right away
+            connection.exec_driver_sql('BEGIN')
+        db.session.remove()
+        db.session.registry.set(db.session.session_factory(bind=connection, join_transaction_mode='create_savepoint'))
+        catalog_cache.clear()
+        yield connection
+        db.session.remove()
+        transaction.rollback()
+        connection.close()
+
+@pytest.fixture(scope='function')
+def clean_tables(app):
+    """
+    Pytest fixture emptying every table after the test, for tests committing through connections of their own.
+    """
+    catalog_cache.clear()
+    yield
+    with app.app_context():
+        db.session.remove()
+        with db.engine.begin() as connection:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
+    catalog_cache.clear()
+
+@pytest.fixture(scope='function')
+def concurrent_transactions():
+    """
+    Pytest fixture skipping tests whose threads run transactions side by side, which the single
+    connection of an in-memory database cannot.
+    """
+    if in_memory_database(database_url()):
+        pytest.skip("concurrent transactions need a database with more than one connection")
+
+@pytest.fixture(scope='function')
+def count_queries(app):
+    """
+    Pytest fixture returning a context manager that collects every SQL statement run on the engine of the
+    current app inside its block, e.g. `with count_queries() as statements:`; with_parameters=True collects
+    (statement, parameters) pairs instead.
+    """
+    @contextmanager
+    def count_queries(with_parameters=False):
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            # The SAVEPOINTs isolating the test are not statements of the code under test
+            if 'SAVEPOINT' not in statement:
+                statements.append((statement, parameters) if with_parameters else statement)
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return count_queries
@@ -0,0 +1,99 @@
+# pytest/dataset_test.py
+import sys, os
+# Get the parent directory of the current file (dataset_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from collections import Counter
+from sqlalchemy import func, select
+from models import (db, Person, Staff, Customer, CorporateCustomer, Item, Veggie, PremadeBox,
+                    Order, OrderLine, Payment, CreditCardPayment, DebitCardPayment, DailySales, ItemDailySales)
+from catalog import current_catalog_version
+from dataset import generate_dataset
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, clean_tables):
+    """
+    Pytest fixture to set up the Flask app on the test database holding one staff member, emptied after each test.
+    """
+    with app.app_context():
+        db.session.add(Staff(first_name='Alice', last_name='Staff', username='staff', password='123',
+                             dept_name='Sales', staff_id='S1'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_rows_load_as_their_classes(test_app):
+    """
+    Test that the generated persons, items and payments load as their concrete classes, with the rows
+    of every table of their hierarchy.
+    """
+    counts = generate_dataset(customers=50, staff=3, items=40, orders=300, batch_size=70, seed=1)
+    assert counts['persons'] == 53 and counts['customers'] == 50 and counts['orders'] == 300
+    assert counts['order_lines'] == db.session.query(OrderLine).count()
+
+    people = Counter(type(person) for person in Person.query.all())
+    assert people[Staff] == 4
+    assert people[Customer] + people[CorporateCustomer] == 50 and people[CorporateCustomer] > 0
+    items = Counter(type(item) for item in Item.query.all())
+    assert set(items) == {Veggie, PremadeBox}
+    assert all(len([pricing for pricing in (veggie.weight_pricing, veggie.pack_pricing, veggie.unit_pricing) if pricing]) == 1
+               for veggie in Veggie.query.all())
+    payments = Counter(type(payment) for payment in Payment.query.all())
+    assert set(payments) == {Payment, CreditCardPayment, DebitCardPayment}
+    assert all(card.card_number and card.card_type for card in CreditCardPayment.query.all())
+
+def test_payments_match_orders(test_app):
+    """
+    Test that completed orders are paid in full, cancelled orders not at all, and that the sales rollups
+    and the catalog version are brought up to date.
+    """
+    generate_dataset(customers=30, staff=2, items=20, orders=200, seed=2)
+    paid = dict(db.session.execute(
+        select(Payment.order_id, func.sum(Payment.payment_amount)).group_by(Payment.order_id)).all())
+    for order in Order.query.all():
+        assert all(payment.customer_id == order.order_customer for payment in order.payments)
+        if order.order_status == 'Completed':
+            assert paid[order.id] == pytest.approx(order.total_amount, abs=0.02)
+        elif order.order_status == 'Cancelled':
+            assert order.id not in paid
+
+    rolled_up = db.session.execute(select(func.sum(DailySales.total_amount))).scalar()
+    assert rolled_up == pytest.approx(db.session.execute(select(func.sum(Payment.payment_amount))).scalar())
+    assert db.session.query(ItemDailySales).count() > 0
+    assert current_catalog_version() > 0
+
+def test_skew_and_repeatability(test_app):
+    """
+    Test that a few items account for most order lines, and that the same seed adds the same data again
+    after the rows already there.
+    """
+    generate_dataset(customers=20, staff=1, items=50, orders=500, seed=3)
+    lines_per_item = sorted(db.session.execute(
+        select(func.count(OrderLine.id)).group_by(OrderLine.item_number)).scalars(), reverse=True)
+    assert sum(lines_per_item[:10]) > sum(lines_per_item) / 2
+
+    first = [(order.order_status, order.total_amount) for order in Order.query.order_by(Order.id)]
+    generate_dataset(customers=20, staff=1, items=50, orders=500, seed=3)
+    second = [(order.order_status, order.total_amount) for order in Order.query.order_by(Order.id)][500:]
+    assert second == first
+    assert db.session.query(Customer).count() == 40
+
+@pytest.mark.parametrize('option', ['--customers', '--staff', '--items', '--batch-size'])
+def test_command_needs_at_least_one(test_app, option):
+    """
+    Test that the command refuses to run without customers, staff or items to build the orders from.
+    """
+    result = test_app.test_cli_runner().invoke(args=['generate-dataset', option, '0'])
+    assert result.exit_code == 2
+    assert 'Invalid value' in result.output
+    assert Person.query.count() == 1
@@ -0,0 +1,102 @@
+# pytest/identity_test.py
+import sys, os
+# Get the parent directory of the current file (identity_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from flask import g
+from models import db, Staff, Customer, CorporateCustomer
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, db_transaction):
+    """
+    Pytest fixture to set up the Flask app on the test database, rolled back after each test.
+    """
+    return app
+
+@pytest.fixture
+def people(test_app):
+    """
+    Fixture to create a staff member, a private customer and a corporate customer.
+    """
+    staff = Staff(first_name='Alice', last_name='Staff', username='staff', password='123', dept_name='Sales', staff_id='S1')
+    private = Customer(first_name='Bob', last_name='Private', username='private', password='123',
+                       cust_address='1 Main St', cust_id='C1', distance_from_store=5.0, cust_balance=20.0)
+    corporate = CorporateCustomer(first_name='Corp', last_name='Customer', username='corporate', password='123',
+                                  cust_address='2 Main St', cust_id='C2', distance_from_store=5.0, max_credit=500.0)
+    db.session.add_all([staff, private, corporate])
+    db.session.commit()
+    return staff.id, private.id, corporate.id
+
+def login(client, username):
+    return client.post('/login', data={'username': username, 'password': '123'})
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_login_stores_profile(test_app, people):
+    """
+    Test that logging in keeps the role and profile of the user in the session.
+    """
+    staff_id, private_id, corporate_id = people
+    client = test_app.test_client()
+    login(client, 'corporate')
+    with client.session_transaction() as sess:
+        assert sess['user_id'] == corporate_id
+        assert sess['user_type'] == 'customer'
+        assert sess['profile']['is_corporate'] is True
+        assert sess['profile']['first_name'] == 'Corp'
+
+def test_dashboard_needs_no_identity_query(test_app, people, count_queries):
+    """
+    Test that a page only showing who is logged in is served from the session profile.
+    """
+    client = test_app.test_client()
+    login(client, 'staff')
+    with count_queries() as statements:
+        response = client.get('/dashboard')
+    assert b"Welcome Alice Staff" in response.data
+    assert statements == []
+
+def test_principal_credit_fields(test_app, people, count_queries):
+    """
+    Test that the credit fields of the principal are read once per request.
+    """
+    staff_id, private_id, corporate_id = people
+    client = test_app.test_client()
+    login(client, 'corporate')
+    with client:
+        with count_queries() as statements:
+            client.get('/customer_details')
+            assert g.principal.is_customer and g.principal.is_corporate
+            assert g.principal.max_credit == 500.0
+            assert g.principal.cust_balance == 0.0
+        assert len(statements) == 1
+
+def test_old_session_is_upgraded(test_app, people):
+    """
+    Test that a session without a profile gets one, and a session of a deleted user is cleared.
+    """
+    staff_id, private_id, corporate_id = people
+    client = test_app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = private_id
+    response = client.get('/dashboard')
+    assert b"Welcome Bob Private" in response.data
+    with client.session_transaction() as sess:
+        assert sess['profile']['role'] == 'customer'
+        assert sess['user_type'] == 'customer'
+
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess['user_id'] = 12345
+    response = client.get('/dashboard')
+    assert response.status_code == 302
+    with client.session_transaction() as sess:
+        assert 'user_id' not in sess
@@ -0,0 +1,141 @@
+# pytest/index_test.py
+import sys, os
+# Get the parent directory of the current file (index_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import re
+import pytest
+from datetime import datetime, timedelta
+from models import db, Customer, Staff, Item, Order, OrderLine, Payment
+from reporting import total_sales_since, top_items
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, db_transaction):
+    """
+    Pytest fixture to set up the Flask app on the test database, rolled back after each test.
+    """
+    return app
+
+@pytest.fixture
+def order(test_app):
+    """
+    Fixture to create a staff member, and a customer with a pending order of one line, paid in part.
+    """
+    staff = Staff(first_name='Alice', last_name='Staff', username='staff', password='123', dept_name='Sales', staff_id='S1')
+    customer = Customer(first_name='Bob', last_name='Customer', username='customer', password='123',
+                        cust_address='1 Main St', cust_id='C1', distance_from_store=5.0)
+    item = Item(name='Carrot', price=2.0, type='Veggie', stock_quantity=10)
+    db.session.add_all([staff, customer, item])
+    db.session.flush()
+    order = Order(order_customer=customer.id, order_date=datetime.now(), order_number='O1', order_status='Pending',
+                  total_amount=4.0)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add_all([
+        OrderLine(item_number=item.id, order_id=order.id, quantity=2, order_type='unit'),
+        Payment(payment_amount=2.0, payment_method='Charge to Account', payment_id='P1', customer_id=customer.id,
+                order_id=order.id),
+    ])
+    db.session.commit()
+    return order.id
+
+def login(client, username):
+    return client.post('/login', data={'username': username, 'password': '123'})
+
+def statement_with(statements, *fragments):
+    """Return the one collected (statement, parameters) pair whose statement contains every fragment."""
+    matches = [(statement, parameters) for statement, parameters in statements
+               if all(fragment in statement for fragment in fragments)]
+    assert len(matches) == 1, matches
+    return matches[0]
+
+def indexes_used(statement, parameters):
+    """
+    Return the names of the indexes the database chooses to run a statement with: the key column of
+    EXPLAIN on MySQL, which leaves out the indexes that were only considered, or the USING INDEX
+    clauses of the query plan on SQLite.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite":
+        plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).mappings().all()
+        return {name for row in plan for name in re.findall(r"USING (?:COVERING )?INDEX (\w+)", row["detail"])}
+    plan = connection.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+    return {name for row in plan if row["key"] for name in row["key"].split(",")}
+
+def primary_key_index(table):
+    """Return the name of the index of the primary key of a table, for the tables whose primary key is not their rowid."""
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite":
+        return next(row[1] for row in connection.exec_driver_sql(f"PRAGMA index_list({table})") if row[3] == "pk")
+    return "PRIMARY"
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_customer_order_listing_uses_index(test_app, order, count_queries):
+    """
+    Test the page of current orders of a customer is read through the status, customer and date index.
+    """
+    client = test_app.test_client()
+    login(client, 'customer')
+    with count_queries(with_parameters=True) as statements:
+        assert client.get('/current_orders').status_code == 200
+    page = statement_with(statements, "FROM orders", "ORDER BY orders.order_date DESC")
+    assert "ix_orders_status_customer_date" in indexes_used(*page)
+
+def test_staff_order_listing_uses_index(test_app, order, count_queries):
+    """
+    Test the page of current orders shown to staff is read through the status and date index.
+    """
+    client = test_app.test_client()
+    login(client, 'staff')
+    with count_queries(with_parameters=True) as statements:
+        assert client.get('/current_orders').status_code == 200
+    page = statement_with(statements, "FROM orders", "ORDER BY orders.order_date DESC")
+    assert "ix_orders_status_date" in indexes_used(*page)
+
+def test_order_payments_use_index(test_app, order, count_queries):
+    """
+    Test the payments of the orders of a customer are looked up by index.
+    """
+    client = test_app.test_client()
+    login(client, 'customer')
+    with count_queries(with_parameters=True) as statements:
+        assert client.get(f'/my_orders/{order}').status_code == 200
+    payments = statement_with(statements, "FROM payments", "payments.order_id IN")
+    assert "ix_payments_order_id" in indexes_used(*payments)
+
+def test_order_lines_use_index(test_app, order, count_queries):
+    """
+    Test the lines of an order are joined to it by index.
+    """
+    client = test_app.test_client()
+    login(client, 'customer')
+    with count_queries(with_parameters=True) as statements:
+        assert client.get(f'/my_orders/{order}').status_code == 200
+    orders = statement_with(statements, "FROM orders", "JOIN order_lines")
+    assert "ix_order_lines_order_id" in indexes_used(*orders)
+
+def test_sales_report_uses_index(test_app, count_queries):
+    """
+    Test the sales total of the report window reads the whole days from the daily sales rollup through its
+    primary key, and the payments of the first, partial day through the payment date index.
+    """
+    with count_queries(with_parameters=True) as statements:
+        total_sales_since(datetime.now() - timedelta(weeks=1))
+    assert primary_key_index("daily_sales") in indexes_used(*statement_with(statements, "FROM daily_sales"))
+    assert "ix_payments_payment_date" in indexes_used(*statement_with(statements, "FROM payments"))
+
+def test_popular_items_use_index(test_app, count_queries):
+    """
+    Test the best selling items are read from the per item daily counters of the window through their primary key.
+    """
+    with count_queries(with_parameters=True) as statements:
+        top_items(7, 10)
+    assert primary_key_index("item_daily_sales") in indexes_used(*statement_with(statements, "FROM items"))
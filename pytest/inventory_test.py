@@ -0,0 +1,82 @@
+# pytest/inventory_test.py
+import sys, os
+# Get the parent directory of the current file (inventory_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import threading
+import pytest
+from models import db, Item
+from inventory import reserve_stock
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, clean_tables):
+    """
+    Pytest fixture to set up the Flask app on the test database, emptied after each test.
+    """
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+def create_stocked_item(stock_quantity):
+    item = Item(name='Carrot', description='Fresh Carrot', price=2.0, type='Veggie', stock_quantity=stock_quantity)
+    db.session.add(item)
+    db.session.commit()
+    return item.id
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_reserve_stock(test_app):
+    """
+    Test reserving stock decrements it and refuses to go below zero.
+    """
+    item_id = create_stocked_item(5)
+
+    assert reserve_stock(item_id, 3)
+    assert not reserve_stock(item_id, 3)
+    assert reserve_stock(item_id, 2)
+    db.session.commit()
+
+    assert db.session.get(Item, item_id).stock_quantity == 0
+
+def test_reserve_stock_concurrently(test_app, concurrent_transactions):
+    """
+    Test that many workers reserving the same item never oversell it.
+    """
+    stock = 50
+    item_id = create_stocked_item(stock)
+    workers, attempts = 8, 20
+    reserved = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        with test_app.app_context():
+            try:
+                for _ in range(attempts):
+                    ok = reserve_stock(item_id, 1)
+                    db.session.commit()
+                    if ok:
+                        with lock:
+                            reserved.append(1)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    db.session.expire_all()
+    assert len(reserved) == stock
+    assert db.session.get(Item, item_id).stock_quantity == 0
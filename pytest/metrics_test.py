@@ -0,0 +1,161 @@
+# pytest/metrics_test.py
+import sys, os
+# Get the parent directory of the current file (metrics_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+import subprocess
+from prometheus_client import REGISTRY
+from models import db, Staff, Customer, Order, Veggie, UnitPricing
+from catalog import catalog_cache
+from main import Initialize_app
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(clean_tables):
+    """
+    Pytest fixture to set up an app of its own on the test database with a staff member, a customer and
+    a vegetable, emptied after each test.
+    """
+    app = Initialize_app()
+    # Answer the broken view with a server error, as in production, instead of raising its exception in the test
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+
+    @app.route("/broken")
+    def broken():
+        raise RuntimeError("broken view")
+
+    with app.app_context():
+        catalog_cache.clear()
+        staff = Staff(first_name='Alice', last_name='Staff', username='staff', password='123', dept_name='Sales', staff_id='S1')
+        db.session.add(staff)
+        db.session.flush()
+        db.session.add(Customer(first_name='Bob', last_name='Customer', username='customer', password='123',
+                                cust_address='1 Main St', cust_id='C1', distance_from_store=5.0, max_owing=100.0,
+                                cust_balance=5.0))
+        db.session.add(Veggie(name='Carrot', price=2.0, type='Veggie', stock_quantity=10, veg_name='Carrot',
+                              staff_id=staff.id, unit_pricing=UnitPricing(price_per_unit=2.0, quantity=1)))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_request_metrics(test_app):
+    """
+    Test that requests are counted and timed per endpoint, and server errors counted.
+    """
+    requests_before = sample('http_requests_total', endpoint='home', method='GET', status='200')
+    timed_before = sample('http_request_duration_seconds_count', endpoint='home', method='GET')
+    errors_before = sample('http_request_errors_total', endpoint='broken', method='GET')
+    client = test_app.test_client()
+    client.get('/')
+    client.get('/')
+    assert client.get('/broken').status_code == 500
+    client.get('/no/such/page')
+
+    assert sample('http_requests_total', endpoint='home', method='GET', status='200') == requests_before + 2
+    assert sample('http_request_duration_seconds_count', endpoint='home', method='GET') == timed_before + 2
+    assert sample('http_request_errors_total', endpoint='broken', method='GET') == errors_before + 1
+    assert sample('http_requests_total', endpoint='unmatched', method='GET', status='404') >= 1
+
+def test_made_up_methods_share_one_label(test_app):
+    """
+    Test that requests with methods outside the standard ones are counted under one "other" label.
+    """
+    other_before = sample('http_requests_total', endpoint='unmatched', method='other', status='405')
+    client = test_app.test_client()
+    for number in range(5):
+        assert client.open('/', method=f'X{number}').status_code == 405
+
+    assert sample('http_requests_total', endpoint='unmatched', method='other', status='405') == other_before + 5
+    assert REGISTRY.get_sample_value('http_requests_total', {'endpoint': 'unmatched', 'method': 'X0', 'status': '405'}) is None
+
+def test_order_and_payment_metrics(test_app):
+    """
+    Test that placed orders and the outcome of payments are counted.
+    """
+    placed_before = sample('orders_placed_total', placed_by='customer')
+    declined_before = sample('payments_total', method='Account', outcome='insufficient_balance')
+    paid_before = sample('payments_total', method='Account', outcome='succeeded')
+    client = test_app.test_client()
+    client.post('/login', data={'username': 'customer', 'password': '123'})
+    carrot_id = Veggie.query.one().id
+    client.post('/place_order', data={f'order_{carrot_id}': '2', f'order_type_{carrot_id}': 'unit'})
+    order_id = Order.query.one().id
+    client.post(f'/checkout/{order_id}', data={'payment_method': 'Account', 'payment_amount': '50'})
+    client.post(f'/checkout/{order_id}', data={'payment_method': 'Account', 'payment_amount': '4'})
+
+    assert sample('orders_placed_total', placed_by='customer') == placed_before + 1
+    assert sample('payments_total', method='Account', outcome='insufficient_balance') == declined_before + 1
+    assert sample('payments_total', method='Account', outcome='succeeded') == paid_before + 1
+
+def test_cache_metrics(test_app):
+    """
+    Test that catalog cache and conditional GET hits and misses are counted.
+    """
+    test_app.config['CATALOG_VERSION_POLL_SECONDS'] = 60
+    client = test_app.test_client()
+    client.post('/login', data={'username': 'customer', 'password': '123'})
+    catalog_misses = sample('cache_requests_total', cache='catalog', result='miss')
+    catalog_hits = sample('cache_requests_total', cache='catalog', result='hit')
+    not_modified = sample('cache_requests_total', cache='conditional_get', result='hit')
+
+    etag = client.get('/vegetables').headers['ETag']
+    client.get('/vegetables', headers={'If-None-Match': etag})
+    assert client.get('/vegetables', headers={'If-None-Match': etag}).status_code == 304
+
+    assert sample('cache_requests_total', cache='catalog', result='miss') == catalog_misses + 1
+    assert sample('cache_requests_total', cache='catalog', result='hit') == catalog_hits + 2
+    assert sample('cache_requests_total', cache='conditional_get', result='hit') == not_modified + 2
+
+def test_metrics_endpoint(test_app):
+    """
+    Test that /metrics serves the metrics in the Prometheus text format to logged-in staff.
+    """
+    client = test_app.test_client()
+    client.get('/')
+    assert client.get('/metrics').status_code == 403
+    client.post('/login', data={'username': 'customer', 'password': '123'})
+    assert client.get('/metrics').status_code == 403
+    client.get('/logout')
+    client.post('/login', data={'username': 'staff', 'password': '123'})
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{endpoint="home"' in text
+    assert 'db_pool_checked_out' in text
+
+def test_metrics_token(test_app, monkeypatch):
+    """
+    Test that a scraper carrying the configured bearer token may read /metrics without logging in.
+    """
+    client = test_app.test_client()
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 403
+    monkeypatch.setitem(test_app.config, 'METRICS_TOKEN', 'secret')
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/metrics').status_code == 403
+
+def test_metrics_add_up_across_workers(tmp_path):
+    """
+    Test that in multiprocess mode the metrics of every worker process are added up.
+    """
+    environment = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = "import metrics; metrics.orders_placed.labels('staff').inc(3)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], cwd=parent_dir, env=environment, check=True)
+    scrape = "import metrics, sys; sys.stdout.write(metrics.render_metrics().decode())"
+    text = subprocess.run([sys.executable, "-c", scrape], cwd=parent_dir, env=environment, check=True,
+                          capture_output=True, text=True).stdout
+    assert 'orders_placed_total{placed_by="staff"} 6.0' in text
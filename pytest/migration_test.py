@@ -0,0 +1,164 @@
+# pytest/migration_test.py
+import sys, os
+# Get the parent directory of the current file (migration_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade, downgrade
+from sqlalchemy import text
+from models import (db, Person, Staff, Customer, CorporateCustomer, Item, Veggie, WeightPricing, PackPricing,
+                    UnitPricing, PremadeBox, Payment, CreditCardPayment, DebitCardPayment)
+from main import Initialize_app
+from config import in_memory_database
+from conftest import database_url, create_database
+
+MIGRATIONS_DIR = os.path.join(parent_dir, 'migrations')
+MAPPED_CLASSES = [Person, Staff, Customer, CorporateCustomer, Item, Veggie, WeightPricing, PackPricing, UnitPricing,
+                  PremadeBox, Payment, CreditCardPayment, DebitCardPayment]
+
+def load_every_class():
+    """Query every mapped class, and get every row it returns by primary key, from an empty session.
+    Returns the classes of the rows loaded for every mapped class, by id."""
+    loaded = {}
+    for cls in MAPPED_CLASSES:
+        db.session.expunge_all()
+        queried = {row.id: type(row) for row in cls.query.all()}
+        db.session.expunge_all()
+        assert {id: type(db.session.get(cls, id)) for id in queried} == queried
+        loaded[cls] = queried
+    return loaded
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(monkeypatch):
+    """
+    Pytest fixture to set up the Flask app with an empty database of its own, next to the test database,
+    so the migrations do not drop the schema shared by the other tests.
+    """
+    url = database_url('migrations')
+    if in_memory_database(url):
+        # Give this app a memory database of its own, rather than the one shared by the whole suite
+        url = url.set(database='file:migrations?mode=memory&cache=shared', query={'uri': 'true'})
+    create_database(url)
+    monkeypatch.setenv('DATABASE_URL', url.render_as_string(hide_password=False))
+    app = Initialize_app()
+    with app.app_context():
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        with db.engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        db.engine.dispose()
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_migrations_match_models(test_app):
+    """
+    Test that upgrading an empty database produces exactly the schema declared by the models.
+    """
+    upgrade(directory=MIGRATIONS_DIR)
+    with db.engine.connect() as connection:
+        differences = compare_metadata(MigrationContext.configure(connection), db.metadata)
+    assert differences == []
+
+def test_migrations_downgrade(test_app):
+    """
+    Test that every migration can be rolled back.
+    """
+    upgrade(directory=MIGRATIONS_DIR)
+    downgrade(directory=MIGRATIONS_DIR, revision='base')
+    with db.engine.connect() as connection:
+        tables = db.inspect(connection).get_table_names()
+    assert set(tables) <= {'alembic_version'}
+
+def test_orders_without_date_get_one(test_app):
+    """
+    Test that the upgrade making the order date required dates the orders without one from their payment.
+    """
+    upgrade(directory=MIGRATIONS_DIR, revision='0008')
+    with db.engine.begin() as connection:
+        connection.execute(text("INSERT INTO persons (id, first_name, last_name, password, username, person_type) "
+                                "VALUES (1, 'John', 'Doe', '123', '111', 'customer')"))
+        connection.execute(text("INSERT INTO customers (id, cust_address, cust_balance, cust_id, max_owing, "
+                                "distance_from_store) VALUES (1, '1 Main St', 0, '1', 100, 5)"))
+        connection.execute(text("INSERT INTO orders (id, order_customer, order_date, order_number, order_status, "
+                                "total_amount) VALUES (1, 1, NULL, 'O1', 'Paid', 10), (2, 1, NULL, 'O2', 'Pending', 5)"))
+        connection.execute(text("INSERT INTO payments (id, payment_amount, payment_date, payment_method, payment_id, "
+                                "customer_id, order_id, payment_type) "
+                                "VALUES (1, 10, '2026-03-01 10:00:00', 'Charge to Account', 'P1', 1, 1, 'payment')"))
+    upgrade(directory=MIGRATIONS_DIR)
+    with db.engine.connect() as connection:
+        dates = dict(connection.execute(text("SELECT id, order_date FROM orders")).all())
+    assert str(dates[1]).startswith('2026-03-01 10:00:00')
+    assert dates[2] is not None
+
+def test_every_class_loads_after_upgrade(test_app):
+    """
+    Test that rows written before the discriminators existed load as their classes after upgrading,
+    including a veggie priced in every way.
+    """
+    upgrade(directory=MIGRATIONS_DIR, revision='0006')
+    with db.engine.begin() as connection:
+        for statement in [
+            "INSERT INTO persons (id, first_name, last_name, password, username) VALUES "
+            "(1, 'Alice', 'Brown', '123', '333'), (2, 'John', 'Doe', '123', '111'), (3, 'Corp', 'Cust', '123', '666')",
+            "INSERT INTO staff (id, dept_name, staff_id) VALUES (1, 'Sales', 'STAFF001')",
+            "INSERT INTO customers (id, cust_address, cust_id, distance_from_store) VALUES "
+            "(2, '1 Main St', '1', 5), (3, '2 Main St', '2', 5)",
+            "INSERT INTO corporate_customers (id, distance_from_store) VALUES (3, 5)",
+            "INSERT INTO items (id, name, price, type, stock_quantity) VALUES "
+            "(1, 'Carrot', 2.5, 'Veggie', 100), (2, 'Leek', 2.5, 'Veggie', 100), (3, 'Small Box', 10, 'Box', 20)",
+            "INSERT INTO veggies (id, veg_name, staff_id) VALUES (1, 'Carrot', 1), (2, 'Leek', 1)",
+            "INSERT INTO unit_price_veggies (id, price_per_unit, quantity) VALUES (1, 5, 5), (2, 5, 5)",
+            "INSERT INTO weighted_veggies (id, weight, weight_per_kilo) VALUES (1, 1, 5)",
+            "INSERT INTO pack_veggies (id, num_of_pack, price_per_pack) VALUES (1, 5, 5)",
+            "INSERT INTO premade_boxes (id, box_size, num_of_boxes, staff_id) VALUES (3, 'Small', 20, 1)",
+            "INSERT INTO orders (id, order_customer, order_date, order_number, order_status, total_amount) "
+            "VALUES (1, 2, '2026-03-01 10:00:00', 'O1', 'Paid', 30)",
+            "INSERT INTO payments (id, payment_amount, payment_date, payment_method, payment_id, customer_id, order_id) "
+            "VALUES (1, 10, '2026-03-01 10:00:00', 'Account', 'P1', 2, 1), "
+            "(2, 10, '2026-03-01 10:00:00', 'Credit Card', 'P2', 2, 1), "
+            "(3, 10, '2026-03-01 10:00:00', 'Debit Card', 'P3', 2, 1)",
+            "INSERT INTO credit_card_payments (id, card_expiry_date, card_number, card_type) "
+            "VALUES (2, '12/30', '4111111111111111', 'Visa')",
+            "INSERT INTO debit_card_payments (id, bank_name, debit_card_number) VALUES (3, 'Bank', '5000000000000000')",
+        ]:
+            connection.execute(text(statement))
+    upgrade(directory=MIGRATIONS_DIR)
+
+    loaded = load_every_class()
+    assert loaded[Person] == {1: Staff, 2: Customer, 3: CorporateCustomer}
+    assert loaded[Item] == {1: Veggie, 2: Veggie, 3: PremadeBox}
+    assert loaded[Payment] == {1: Payment, 2: CreditCardPayment, 3: DebitCardPayment}
+    carrot, leek = db.session.get(Veggie, 1), db.session.get(Veggie, 2)
+    assert carrot.weight_pricing and carrot.pack_pricing and carrot.unit_pricing
+    assert leek.unit_pricing and not leek.weight_pricing and not leek.pack_pricing
+
+def test_sample_data_loads(test_app):
+    """
+    Test that the sample data of table.sql loads on the migrated schema, every row as its class.
+    """
+    upgrade(directory=MIGRATIONS_DIR)
+    with open(os.path.join(parent_dir, 'table.sql')) as f:
+        # Comments may hold semicolons of their own
+        statements = "".join(line for line in f if not line.lstrip().startswith('--')).split(';')
+    with db.engine.begin() as connection:
+        for statement in statements:
+            if statement.strip():
+                connection.execute(text(statement))
+
+    loaded = load_every_class()
+    assert len(loaded[Staff]) == 3 and len(loaded[Customer]) == 4 and len(loaded[CorporateCustomer]) == 1
+    # Every sample veggie is sold by unit, by weight and by pack
+    assert len(loaded[Veggie]) == len(loaded[UnitPricing]) == len(loaded[WeightPricing]) == len(loaded[PackPricing]) == 6
+    assert len(loaded[PremadeBox]) == 3
@@ -0,0 +1,140 @@
+# pytest/order_numbers_test.py
+import sys, os
+# Get the parent directory of the current file (order_numbers_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import threading
+import pytest
+import order_numbers
+from order_numbers import (SnowflakeGenerator, next_order_number, next_payment_id, assign_worker_index,
+                           get_generator, set_generator)
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def fresh_process(monkeypatch):
+    """
+    Pytest fixture giving the test the state of a process that has neither a worker index nor a generator yet.
+    """
+    monkeypatch.delenv('ORDER_NODE_ID', raising=False)
+    monkeypatch.delenv('SERVER_SOFTWARE', raising=False)
+    monkeypatch.setattr(order_numbers, '_worker_index', None)
+    monkeypatch.setattr(order_numbers, '_generator', None)
+    monkeypatch.setattr(order_numbers, '_generator_pid', None)
+    yield monkeypatch
+    set_generator(None)
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_ids_are_unique_and_increasing():
+    """
+    Test that one generator produces strictly increasing ids.
+    """
+    generator = SnowflakeGenerator(worker_id=1)
+    ids = [generator.next_id() for _ in range(10000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+def test_ids_are_unique_across_threads_and_workers():
+    """
+    Test that concurrent threads and different workers never produce the same id.
+    """
+    generators = [SnowflakeGenerator(worker_id=1), SnowflakeGenerator(worker_id=2)]
+    ids = []
+    lock = threading.Lock()
+
+    def worker(generator):
+        generated = [generator.next_id() for _ in range(2000)]
+        with lock:
+            ids.extend(generated)
+
+    threads = [threading.Thread(target=worker, args=(generators[i % 2],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(ids) == 8 * 2000
+    assert len(set(ids)) == len(ids)
+
+def test_sequence_exhaustion_waits_for_next_millisecond():
+    """
+    Test that the generator moves to the next millisecond once the sequence is used up.
+    """
+    ticks = iter([1800000000.0] * (SnowflakeGenerator.MAX_SEQUENCE + 2) + [1800000000.001] * 10)
+    generator = SnowflakeGenerator(worker_id=3, clock=lambda: next(ticks))
+    ids = [generator.next_id() for _ in range(SnowflakeGenerator.MAX_SEQUENCE + 2)]
+    assert len(set(ids)) == len(ids)
+    assert ids[-1] >> (SnowflakeGenerator.WORKER_BITS + SnowflakeGenerator.SEQUENCE_BITS) > ids[0] >> (SnowflakeGenerator.WORKER_BITS + SnowflakeGenerator.SEQUENCE_BITS)
+
+def test_clock_moving_backwards_keeps_ids_increasing():
+    """
+    Test that a clock adjustment backwards does not produce smaller ids.
+    """
+    ticks = iter([1800000001.0, 1800000000.0, 1800000000.0])
+    generator = SnowflakeGenerator(worker_id=4, clock=lambda: next(ticks))
+    ids = [generator.next_id() for _ in range(3)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 3
+
+def test_invalid_worker_id():
+    """
+    Test that out of range worker ids are rejected.
+    """
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(worker_id=SnowflakeGenerator.MAX_WORKER_ID + 1)
+
+def test_order_numbers_and_payment_ids():
+    """
+    Test the formatted order numbers and payment ids.
+    """
+    first, second = next_order_number(), next_order_number()
+    assert first.startswith("ORD") and len(first) == 22
+    assert first < second
+    assert next_payment_id().startswith("PAY")
+
+def test_single_process_is_worker_zero_of_its_node(fresh_process):
+    """
+    Test that a process on its own, e.g. the development server, takes index 0 on the node of ORDER_NODE_ID.
+    """
+    fresh_process.setenv('ORDER_NODE_ID', '3')
+    assert get_generator().worker_id == 3 << order_numbers.INDEX_BITS
+
+def test_worker_index(fresh_process):
+    """
+    Test that a worker given an index gets a generator of its own, with the worker id of its node and index.
+    """
+    fresh_process.setenv('ORDER_NODE_ID', '3')
+    fresh_process.setenv('SERVER_SOFTWARE', 'gunicorn/23.0.0')
+    assign_worker_index(2)
+    assert get_generator().worker_id == (3 << order_numbers.INDEX_BITS) | 2
+    with pytest.raises(ValueError):
+        assign_worker_index(order_numbers.MAX_WORKER_INDEX + 1)
+    fresh_process.setenv('ORDER_NODE_ID', str(order_numbers.MAX_NODE_ID + 1))
+    with pytest.raises(ValueError):
+        assign_worker_index(0)
+
+def test_gunicorn_worker_without_index_fails(fresh_process):
+    """
+    Test that a gunicorn worker never guesses a worker id its siblings could have too.
+    """
+    fresh_process.setenv('SERVER_SOFTWARE', 'gunicorn/23.0.0')
+    with pytest.raises(RuntimeError):
+        next_order_number()
+
+def test_forked_process_without_index_fails(fresh_process):
+    """
+    Test that a process forked from one generating ids neither reuses its generator nor its worker index.
+    """
+    pid = os.getpid()
+    next_order_number()
+    fresh_process.setattr(order_numbers.os, 'getpid', lambda: pid + 1)
+    with pytest.raises(RuntimeError):
+        next_order_number()
+    assign_worker_index(1)
+    assert get_generator().worker_id == 1
@@ -1,207 +1,52 @@
-CREATE DATABASE IF NOT EXISTS vegetable_shop_test;
-USE vegetable_shop_test;
+-- Sample data of the route tests, loaded by reset_database(1) into the empty tables of the test
+-- database. Plain INSERT statements only, so it loads on MySQL and SQLite alike.
 
--- Drop existing tables in a dependent order to avoid constraint issues
-
-DROP TABLE IF EXISTS corporate_customers;
-DROP TABLE IF EXISTS weighted_veggies;
-DROP TABLE IF EXISTS pack_veggies;
-DROP TABLE IF EXISTS unit_price_veggies;
-DROP TABLE IF EXISTS veggies;
-DROP TABLE IF EXISTS premade_boxes;
-
-DROP TABLE IF EXISTS credit_card_payments;
-DROP TABLE IF EXISTS debit_card_payments;
-
-DROP TABLE IF EXISTS order_lines;
-DROP TABLE IF EXISTS payments;
-DROP TABLE IF EXISTS orders;
-DROP TABLE IF EXISTS items;
-DROP TABLE IF EXISTS staff;
-DROP TABLE IF EXISTS customers;
-DROP TABLE IF EXISTS persons;
-
-
-USE vegetable_shop_test;
-
--- Create tables as per the updated model structure
-CREATE TABLE persons (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    first_name VARCHAR(100) NOT NULL,
-    last_name VARCHAR(100) NOT NULL,
-    password VARCHAR(100) NOT NULL,
-    username VARCHAR(100) UNIQUE NOT NULL
-);
-
-CREATE TABLE customers (
-    id INT PRIMARY KEY,
-    cust_id VARCHAR(100) UNIQUE NOT NULL,
-    cust_address VARCHAR(255) NOT NULL,
-    cust_balance FLOAT DEFAULT 0.0,
-    max_owing FLOAT DEFAULT 1000.0,
-    distance_from_store FLOAT NOT NULL,
-    FOREIGN KEY (id) REFERENCES persons(id)
-);
-
-CREATE TABLE corporate_customers (
-    id INT PRIMARY KEY,
-    discount_rate FLOAT DEFAULT 0.05,
-    max_credit FLOAT DEFAULT 10000.0,
-    min_balance FLOAT DEFAULT 1000.0,
-    distance_from_store FLOAT NOT NULL,
-    FOREIGN KEY (id) REFERENCES customers(id)
-);
-
-CREATE TABLE staff (
-    id INT PRIMARY KEY,
-    date_joined DATE DEFAULT (curdate()),
-    dept_name VARCHAR(100) NOT NULL,
-    staff_id VARCHAR(100) UNIQUE NOT NULL,
-    FOREIGN KEY (id) REFERENCES persons(id)
-);
-
-CREATE TABLE items (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    name VARCHAR(100) NOT NULL,
-    description VARCHAR(255),
-    price FLOAT NOT NULL CHECK (price >= 0.0),
-    type VARCHAR(50),
-    stock_quantity INT DEFAULT 0 CHECK (stock_quantity >= 0)
-);
-
-CREATE TABLE veggies (
-    id INT PRIMARY KEY,
-    veg_name VARCHAR(100) NOT NULL,
-    staff_id INT,
-    FOREIGN KEY (id) REFERENCES items(id),
-    FOREIGN KEY (staff_id) REFERENCES staff(id)
-);
-
-CREATE TABLE weighted_veggies (
-    id INT PRIMARY KEY,
-    weight FLOAT NOT NULL,
-    weight_per_kilo FLOAT NOT NULL,
-    FOREIGN KEY (id) REFERENCES veggies(id)
-);
-
-CREATE TABLE pack_veggies (
-    id INT PRIMARY KEY,
-    num_of_pack INT NOT NULL,
-    price_per_pack FLOAT NOT NULL,
-    FOREIGN KEY (id) REFERENCES veggies(id)
-);
-
-CREATE TABLE unit_price_veggies (
-    id INT PRIMARY KEY,
-    price_per_unit FLOAT NOT NULL,
-    quantity INT NOT NULL,
-    FOREIGN KEY (id) REFERENCES veggies(id)
-);
-
-CREATE TABLE premade_boxes (
-    id INT PRIMARY KEY,
-    box_size VARCHAR(50) NOT NULL,
-    num_of_boxes INT NOT NULL,
-    staff_id INT,
-    FOREIGN KEY (id) REFERENCES items(id),
-    FOREIGN KEY (staff_id) REFERENCES staff(id)
-);
-
-CREATE TABLE orders (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    order_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    order_number VARCHAR(100) UNIQUE NOT NULL,
-    order_status VARCHAR(50) NOT NULL,
-    total_amount FLOAT NOT NULL,  -- Added to store the total amount of the order
-    order_customer INT NOT NULL,
-    staff_id INT,
-    FOREIGN KEY (order_customer) REFERENCES customers(id),
-    FOREIGN KEY (staff_id) REFERENCES staff(id)
-);
-
-CREATE TABLE order_lines (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    item_number INT NOT NULL,
-    order_id INT NOT NULL,
-    quantity INT DEFAULT 1,
-    order_type VARCHAR(50),
-    FOREIGN KEY (item_number) REFERENCES items(id),
-    FOREIGN KEY (order_id) REFERENCES orders(id)
-);
-
-CREATE TABLE payments (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    payment_amount FLOAT NOT NULL,
-    payment_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-    payment_method VARCHAR(50) NOT NULL,
-    customer_id INT NOT NULL,
-    payment_id VARCHAR(100) UNIQUE NOT NULL,
-    order_id INT NOT NULL,  -- Added to associate the payment with a specific order
-    FOREIGN KEY (customer_id) REFERENCES customers(id),
-    FOREIGN KEY (order_id) REFERENCES orders(id)  -- Link payment to the specific order
-);
-
-
-CREATE TABLE credit_card_payments (
-    id INT PRIMARY KEY,
-    card_expiry_date VARCHAR(5) NOT NULL,
-    card_number VARCHAR(16) NOT NULL,
-    card_type VARCHAR(50) NOT NULL,
-    FOREIGN KEY (id) REFERENCES payments(id)
-);
-
-CREATE TABLE debit_card_payments (
-    id INT PRIMARY KEY,
-    bank_name VARCHAR(100) NOT NULL,
-    debit_card_number VARCHAR(16) NOT NULL,
-    FOREIGN KEY (id) REFERENCES payments(id)
-);
 -- Insert sample persons (users)
-INSERT INTO persons (first_name, last_name, password, username)
-VALUES 
-('John', 'Doe', '123', '111'),
-('Jane', 'Smith', '123', '222'),
-('Alice', 'Brown', '123', '333'),
-('Tom', 'Smith', '123', '444'),
-('Doe', 'Brown', '123', '555'),
-('Corp', 'Cust', '123', '666');
+INSERT INTO persons (id, first_name, last_name, password, username, person_type)
+VALUES
+(1, 'John', 'Doe', '123', '111', 'customer'),
+(2, 'Jane', 'Smith', '123', '222', 'customer'),
+(3, 'Alice', 'Brown', '123', '333', 'staff'),
+(4, 'Tom', 'Smith', '123', '444', 'staff'),
+(5, 'Doe', 'Brown', '123', '555', 'staff'),
+(6, 'Corp', 'Cust', '123', '666', 'customer'),
+(7, 'Alice', 'Brown', '123', '777', 'customer');
 
 -- Insert sample customers
 INSERT INTO customers (id, cust_id, cust_address, cust_balance, max_owing, distance_from_store)
-VALUES 
-(1, 1, '123 Apple St Auckland', 100.0, 100, 19),
-(2, 2, '456 Banana Ave Wellington', 50.0, 80.0, 20),
-(3, 3, '789 Banana Ave Wellington', 40.0, 10.0, 21),
-(6, 6, '700 Mango Ave Christchurch', 1200.0, 10.0, 19);
-
+VALUES
+(1, '1', '123 Apple St Auckland', 100.0, 100, 19),
+(2, '2', '456 Banana Ave Wellington', 50.0, 80.0, 20),
+(6, '6', '700 Mango Ave Christchurch', 1200.0, 10.0, 19),
+-- A person is either a staff member or a customer, so Alice Brown shops with a login of her own
+-- rather than as staff member 3
+(7, '3', '789 Banana Ave Wellington', 40.0, 10.0, 21);
 
 -- Insert sample staff
 INSERT INTO staff (id, date_joined, dept_name, staff_id)
-VALUES 
+VALUES
 (3, '2024-01-15', 'Sales', 'STAFF001'),
 (4, '2024-02-20', 'Admin', 'STAFF002'),
 (5, '2024-03-01', 'Marketing', 'STAFF003');
-INSERT INTO items (name, price, type, stock_quantity, description)
-VALUES 
-('Carrot', 2.5, 'Veggie', 100, 'Fresh organic carrots'),
-('Broccoli', 3.0, 'Veggie', 150, 'Green and healthy broccoli'),
-('Premade Box - Small', 10.0, 'Box', 20, 'A small box with assorted veggies'),
-('Premade Box - Medium', 15.0, 'Box', 10, 'A medium box with more assorted veggies');
-INSERT INTO `vegetable_shop_test`.`items` (`id`, `name`, `description`, `price`, `type`, `stock_quantity`) VALUES ('5', 'Unit Veggies', 'Veggies by unit', '0', 'Unit', '0');
-INSERT INTO `vegetable_shop_test`.`items` (`id`, `name`, `description`, `price`, `type`, `stock_quantity`) VALUES ('6', 'Weight Veggies', 'Veggies by weight', '0', 'Weight', '0');
-INSERT INTO `vegetable_shop_test`.`items` (`id`, `name`, `description`, `price`, `type`, `stock_quantity`) VALUES ('7', 'Pack Veggies', 'Veggies by Pack', '0', 'Pack', '0');
+
+-- Insert sample items
+INSERT INTO items (id, name, price, type, stock_quantity, description, item_type)
+VALUES
+(1, 'Carrot', 2.5, 'Veggie', 100, 'Fresh organic carrots', 'veggie'),
+(2, 'Broccoli', 3.0, 'Veggie', 150, 'Green and healthy broccoli', 'veggie'),
+(3, 'Premade Box - Small', 10.0, 'Box', 20, 'A small box with assorted veggies', 'item'),
+(4, 'Premade Box - Medium', 15.0, 'Box', 10, 'A medium box with more assorted veggies', 'item'),
+(5, 'Unit Veggies', 0, 'Unit', 0, 'Veggies by unit', 'item'),
+(6, 'Weight Veggies', 0, 'Weight', 0, 'Veggies by weight', 'item'),
+(7, 'Pack Veggies', 0, 'Pack', 0, 'Veggies by Pack', 'item');
 
 INSERT INTO veggies (id, veg_name, staff_id)
 VALUES
 (1, 'Carrot', 3),
 (2, 'Broccoli', 3);
 
-INSERT INTO `vegetable_shop_test`.`unit_price_veggies` (`id`, `price_per_unit`, `quantity`) VALUES ('1', '5', '5');
-INSERT INTO `vegetable_shop_test`.`unit_price_veggies` (`id`, `price_per_unit`, `quantity`) VALUES ('2', '10', '5');
-
-INSERT INTO `vegetable_shop_test`.`weighted_veggies` (`id`, `weight`, `weight_per_kilo`) VALUES ('1', '1', '5');
-INSERT INTO `vegetable_shop_test`.`weighted_veggies` (`id`, `weight`,`weight_per_kilo`) VALUES ('2', '1', 10);
+INSERT INTO unit_price_veggies (id, price_per_unit, quantity) VALUES (1, 5, 5), (2, 10, 5);
 
-INSERT INTO `vegetable_shop_test`.`pack_veggies` (`id`, `num_of_pack`, `price_per_pack`) VALUES ('1', '5', '5');
-INSERT INTO `vegetable_shop_test`.`pack_veggies` (`id`, `num_of_pack`, `price_per_pack`) VALUES ('2', '5', '10');
+INSERT INTO weighted_veggies (id, weight, weight_per_kilo) VALUES (1, 1, 5), (2, 1, 10);
 
+INSERT INTO pack_veggies (id, num_of_pack, price_per_pack) VALUES (1, 5, 5), (2, 5, 10);
@@ -0,0 +1,109 @@
+# pytest/query_stats_test.py
+import sys, os
+# Get the parent directory of the current file (query_stats_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+import json
+import logging
+from sqlalchemy import select
+from models import db, Staff, Customer, Person
+from catalog import catalog_cache
+from query_stats import RequestStats, statement_shape
+from main import Initialize_app
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(clean_tables):
+    """
+    Pytest fixture to set up an app of its own on the test database with a staff member, a few customers and
+    a view loading them one query at a time, emptied after each test.
+    """
+    app = Initialize_app()
+
+    @app.route("/one_query_per_customer")
+    def one_query_per_customer():
+        ids = db.session.execute(select(Customer.id)).scalars().all()
+        names = [db.session.execute(select(Person.first_name).where(Person.id == id)).scalar() for id in ids]
+        return ", ".join(names)
+
+    with app.app_context():
+        catalog_cache.clear()
+        db.session.add(Staff(first_name='Alice', last_name='Staff', username='staff', password='123',
+                             dept_name='Sales', staff_id='S1'))
+        for number in range(6):
+            db.session.add(Customer(first_name=f'Customer{number}', last_name='Test', username=f'customer{number}',
+                                    password='123', cust_address='1 Main St', cust_id=f'C{number}', distance_from_store=5.0))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+def staff_client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'staff', 'password': '123'})
+    return client
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_statement_shape():
+    """
+    Test that runs of one query with parameter lists of different lengths have the same shape.
+    """
+    assert statement_shape("SELECT * FROM orders\n WHERE id IN (?, ?, ?)") == "SELECT * FROM orders WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM orders WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == \
+        statement_shape("SELECT * FROM orders WHERE id IN (%(id_1_1)s)")
+
+    stats = RequestStats('GET', '/orders', 'orders')
+    for _ in range(5):
+        stats.record("SELECT * FROM persons WHERE id = ?", 0.001)
+    stats.record("SELECT * FROM orders", 0.01)
+    assert stats.count == 6
+    assert stats.slowest_statement == "SELECT * FROM orders"
+    assert stats.repeated(5) == [("SELECT * FROM persons WHERE id = ?", 5)]
+    assert stats.repeated(6) == []
+
+def test_headers_only_when_enabled(test_app):
+    """
+    Test that the X-DB-* headers are sent in debug mode or with QUERY_STATS_HEADERS, and not otherwise.
+    """
+    client = staff_client(test_app)
+    assert 'X-DB-Query-Count' not in client.get('/customers').headers
+
+    test_app.config['QUERY_STATS_HEADERS'] = True
+    response = client.get('/one_query_per_customer')
+    assert response.headers['X-DB-Query-Count'] == '7'
+    assert float(response.headers['X-DB-Time-Ms']) > 0
+    assert response.headers['X-DB-N-Plus-One'] == '1'
+
+def test_structured_log_line(test_app, caplog):
+    """
+    Test that with QUERY_STATS_LOG every request is logged as one JSON line.
+    """
+    test_app.config['QUERY_STATS_LOG'] = True
+    client = staff_client(test_app)
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='query_stats'):
+        client.get('/one_query_per_customer')
+    summary = json.loads(caplog.records[-1].getMessage())
+    assert summary['endpoint'] == 'one_query_per_customer'
+    assert summary['status'] == 200
+    assert summary['query_count'] == 7
+    assert summary['n_plus_one'][0]['runs'] == 6
+
+def test_debug_requests_page(test_app):
+    """
+    Test that staff can list the worst recent requests, and nobody else can.
+    """
+    assert test_app.test_client().get('/debug/requests').status_code == 302
+    client = staff_client(test_app)
+    client.get('/one_query_per_customer')
+    client.get('/dashboard')
+    page = client.get('/debug/requests?sort=query_count').get_data(as_text=True)
+    assert page.index('GET /one_query_per_customer') < page.index('GET /dashboard')
+    assert '6 &times;' in page
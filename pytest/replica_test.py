@@ -0,0 +1,114 @@
+# pytest/replica_test.py
+import sys, os
+# Get the parent directory of the current file (replica_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from sqlalchemy import insert
+from models import db, Staff, Customer, Person
+from catalog import catalog_cache
+from replica import ReplicaMonitor
+from main import Initialize_app
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(tmp_path, monkeypatch, clean_tables):
+    """
+    Pytest fixture to set up an app of its own on the test database, emptied after each test, and a local
+    SQLite database standing in for its read replica.
+    """
+    monkeypatch.setenv('REPLICA_DATABASE_URL', f"sqlite:///{tmp_path / 'replica.db'}")
+    app = Initialize_app()
+    with app.app_context():
+        db.metadata.create_all(db.engines['replica'])
+        catalog_cache.clear()
+        db.session.add(Staff(first_name='Alice', last_name='Staff', username='staff', password='123',
+                             dept_name='Sales', staff_id='S1'))
+        db.session.add(Customer(first_name='Primary', last_name='Customer', username='primary', password='123',
+                                cust_address='1 Main St', cust_id='C1', distance_from_store=5.0))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+@pytest.fixture
+def replica_copy(test_app):
+    """
+    Fixture giving the replica a customer of its own, so pages show where they were read from.
+    """
+    with db.engines['replica'].begin() as connection:
+        connection.execute(insert(Person.__table__).values(
+            id=100, first_name='Replica', last_name='Customer', username='replica', password='123', person_type='customer'))
+        connection.execute(insert(Customer.__table__).values(
+            id=100, cust_address='2 Main St', cust_id='C100', distance_from_store=5.0, cust_balance=0.0, max_owing=1000.0))
+
+def lag_of(seconds):
+    return lambda connection: seconds
+
+def staff_client(app):
+    client = app.test_client()
+    client.post('/login', data={'username': 'staff', 'password': '123'})
+    return client
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_read_only_routes_read_from_replica(test_app, replica_copy):
+    """
+    Test that the customer directory is read from the replica, and order intake pages from the primary.
+    """
+    client = staff_client(test_app)
+    page = client.get('/customers').get_data(as_text=True)
+    assert 'Replica' in page and 'Primary' not in page
+
+    page = client.get('/place_order').get_data(as_text=True)
+    assert 'Primary' in page and 'Replica' not in page
+
+def test_lagging_replica_falls_back_to_primary(test_app, replica_copy):
+    """
+    Test that a replica lagging more than REPLICA_MAX_LAG_SECONDS behind is not read from.
+    """
+    test_app.extensions['read_replica'] = ReplicaMonitor(max_lag_seconds=5, check_seconds=60, lag_probe=lag_of(30))
+    page = staff_client(test_app).get('/customers').get_data(as_text=True)
+    assert 'Primary' in page and 'Replica' not in page
+    assert test_app.extensions['read_replica'].lag == 30
+
+def test_unreachable_replica_falls_back_to_primary(tmp_path, monkeypatch, clean_tables):
+    """
+    Test that the app keeps working from the primary when the replica cannot be reached.
+    """
+    monkeypatch.setenv('REPLICA_DATABASE_URL', f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    app = Initialize_app()
+    with app.app_context():
+        db.session.add(Staff(first_name='Alice', last_name='Staff', username='staff', password='123',
+                             dept_name='Sales', staff_id='S1'))
+        db.session.commit()
+        response = staff_client(app).get('/customers')
+        assert response.status_code == 200
+        assert app.extensions['read_replica'].healthy is False
+        db.session.remove()
+
+def test_monitor_rechecks_after_interval():
+    """
+    Test that the health of the replica is trusted for REPLICA_CHECK_SECONDS, then checked again.
+    """
+    class Clock:
+        now = 0.0
+        def __call__(self):
+            return self.now
+
+    clock = Clock()
+    lag = {'seconds': 1.0}
+    monitor = ReplicaMonitor(max_lag_seconds=5, check_seconds=5, lag_probe=lambda connection: lag['seconds'], clock=clock)
+    app = Initialize_app()
+    with app.app_context():
+        assert monitor.usable(db.engine) is True
+        lag['seconds'] = 10.0
+        clock.now = 4
+        assert monitor.usable(db.engine) is True
+        clock.now = 5
+        assert monitor.usable(db.engine) is False
@@ -0,0 +1,169 @@
+# pytest/reporting_test.py
+import sys, os
+# Get the parent directory of the current file (reporting_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models import db, Customer, CorporateCustomer, Staff, Item, Veggie, UnitPricing, Order, Payment, DailySales
+from reporting import (
+    customer_type_of, record_sale, backfill_daily_sales, total_sales_since,
+    record_items_sold, top_items, backfill_item_sales
+)
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(app, db_transaction):
+    """
+    Pytest fixture to set up the Flask app on the test database, rolled back after each test.
+    """
+    return app
+
+@pytest.fixture
+def customers(test_app):
+    """
+    Fixture to create a private and a corporate customer with one order each.
+    """
+    private = Customer(first_name='Bob', last_name='Private', username='private', password='123',
+                       cust_address='1 Main St', cust_id='C1', distance_from_store=5.0)
+    corporate = CorporateCustomer(first_name='Corp', last_name='Customer', username='corporate', password='123',
+                                  cust_address='2 Main St', cust_id='C2', distance_from_store=5.0)
+    db.session.add_all([private, corporate])
+    db.session.flush()
+    for customer in (private, corporate):
+        db.session.add(Order(order_customer=customer.id, order_number=f'ORD{customer.id}', order_status='Pending', total_amount=100.0))
+    db.session.flush()
+    return private, corporate
+
+def add_payment(customer, payment_date, method, amount):
+    order = Order.query.filter_by(order_customer=customer.id).first()
+    payment = Payment(payment_amount=amount, payment_date=payment_date, payment_method=method,
+                      payment_id=f'PAY{Payment.query.count()}', customer_id=customer.id, order_id=order.id)
+    db.session.add(payment)
+    record_sale(payment_date, method, customer_type_of(customer.id), amount)
+    db.session.flush()
+
+def rollup():
+    return {(str(row.sales_date), row.payment_method, row.customer_type): (row.total_amount, row.payment_count)
+            for row in DailySales.query.all()}
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_customer_type_of(customers):
+    """
+    Test telling corporate and private customers apart.
+    """
+    private, corporate = customers
+    assert customer_type_of(private.id) == 'Private'
+    assert customer_type_of(corporate.id) == 'Corporate'
+
+def test_record_sale_matches_backfill(customers):
+    """
+    Test that the incrementally maintained rollup equals one rebuilt from the payments.
+    """
+    private, corporate = customers
+    now = datetime.now()
+    add_payment(private, now, 'Credit Card', 10.0)
+    add_payment(private, now, 'Credit Card', 5.0)
+    add_payment(private, now - timedelta(days=3), 'Account', 7.5)
+    add_payment(corporate, now, 'Credit Card', 20.0)
+
+    incremental = rollup()
+    assert incremental[(str(now.date()), 'Credit Card', 'Private')] == (15.0, 2)
+    assert incremental[(str(now.date()), 'Credit Card', 'Corporate')] == (20.0, 1)
+
+    assert backfill_daily_sales() == 3
+    assert rollup() == incremental
+
+def test_total_sales_since(customers):
+    """
+    Test that the report total equals the sum of the payments in the window, including a partial first day.
+    """
+    private, corporate = customers
+    start_date = datetime.now() - timedelta(weeks=1)
+    add_payment(private, start_date - timedelta(minutes=1), 'Credit Card', 1.0)
+    add_payment(private, start_date + timedelta(minutes=1), 'Credit Card', 2.0)
+    add_payment(corporate, start_date + timedelta(days=2), 'Debit Card', 4.0)
+    add_payment(private, datetime.now(), 'Account', 8.0)
+
+    expected = db.session.query(func.sum(Payment.payment_amount)).filter(Payment.payment_date >= start_date).scalar()
+    assert expected == 14.0
+    assert total_sales_since(start_date) == expected
+
+def test_checkout_updates_rollup(test_app, customers):
+    """
+    Test that paying through checkout records the sale in the rollup.
+    """
+    private, corporate = customers
+    db.session.commit()
+    order = Order.query.filter_by(order_customer=private.id).first()
+    client = test_app.test_client()
+    client.post('/login', data={'username': 'private', 'password': '123'})
+    client.post(f'/checkout/{order.id}', data={
+        'payment_method': 'Credit Card',
+        'payment_amount': '40',
+        'card_number': '4111111111111111',
+        'card_expiry_date': '12/25',
+        'card_type': 'Visa'
+    })
+
+    assert rollup() == {(str(datetime.now().date()), 'Credit Card', 'Private'): (40.0, 1)}
+
+def test_item_counters_follow_orders(test_app, customers):
+    """
+    Test that the popular items follow orders being placed, cancelled by staff and cancelled by customers.
+    """
+    private, corporate = customers
+    staff = Staff(first_name='Alice', last_name='Staff', username='staff', password='123', dept_name='Sales', staff_id='S1')
+    db.session.add(staff)
+    db.session.flush()
+    carrot = Veggie(name='Carrot', price=2.0, type='Veggie', stock_quantity=100, veg_name='Carrot',
+                    staff_id=staff.id, unit_pricing=UnitPricing(price_per_unit=2.0, quantity=1))
+    leek = Veggie(name='Leek', price=3.0, type='Veggie', stock_quantity=100, veg_name='Leek',
+                  staff_id=staff.id, unit_pricing=UnitPricing(price_per_unit=3.0, quantity=1))
+    db.session.add_all([carrot, leek])
+    private.max_owing = 100.0
+    db.session.commit()
+
+    client = test_app.test_client()
+    client.post('/login', data={'username': 'private', 'password': '123'})
+    client.post('/place_order', data={f'order_{carrot.id}': '3', f'order_type_{carrot.id}': 'unit', f'order_{leek.id}': '2', f'order_type_{leek.id}': 'unit'})
+    client.post('/place_order', data={f'order_{leek.id}': '4', f'order_type_{leek.id}': 'unit'})
+    assert top_items(7, 10) == [('Leek', 6), ('Carrot', 3)]
+
+    # Staff cancelling and reinstating an order
+    first_order = Order.query.filter(Order.order_number != f'ORD{private.id}', Order.order_customer == private.id).order_by(Order.id).first()
+    staff_client = test_app.test_client()
+    staff_client.post('/login', data={'username': 'staff', 'password': '123'})
+    staff_client.post(f'/update_order_status/{first_order.id}', data={'order_status': 'Cancelled'})
+    assert top_items(7, 10) == [('Leek', 4)]
+    assert backfill_item_sales() == 1
+    assert top_items(7, 10) == [('Leek', 4)]
+    staff_client.post(f'/update_order_status/{first_order.id}', data={'order_status': 'Pending'})
+    assert top_items(7, 10) == [('Leek', 6), ('Carrot', 3)]
+
+    # Customer cancelling an order
+    client.post(f'/cancel_order/{first_order.id}')
+    assert top_items(7, 10) == [('Leek', 4)]
+
+def test_top_items_window(test_app, customers):
+    """
+    Test that only the sales inside the window count.
+    """
+    carrot = Item(name='Carrot', price=2.0, type='Veggie', stock_quantity=100)
+    leek = Item(name='Leek', price=3.0, type='Veggie', stock_quantity=100)
+    db.session.add_all([carrot, leek])
+    db.session.flush()
+    record_items_sold(datetime.now(), [{'item_number': carrot.id, 'quantity': 2}])
+    record_items_sold(datetime.now() - timedelta(days=20), [{'item_number': leek.id, 'quantity': 5}])
+
+    assert top_items(7, 10) == [('Carrot', 2)]
+    assert top_items(30, 10) == [('Leek', 5), ('Carrot', 2)]
+    assert top_items(30, 1) == [('Leek', 5)]
@@ -1,5 +1,5 @@
 # pytest/route_test.py
-import sys, os
+import sys, os, re, html, csv, io, gzip
 from pathlib import Path
 from sqlalchemy import text
 # Get the parent directory of the current file (model_test.py)
@@ -10,31 +10,24 @@ templates_dir = os.path.join(current_dir, 'templates')
 sys.path.insert(0, parent_dir)
 import pytest
 from datetime import datetime
+from sqlalchemy import event
 from models import (
-    Person, Staff, Customer, CorporateCustomer, Item, UnitPriceVeggie,
+    Person, Staff, Customer, CorporateCustomer, Item, Veggie, UnitPricing,
     Order, Payment
 )
 from models import db
-from main import Initialize_app
+from catalog import catalog_cache
 
 
 # # --------------------------------------------
 # # Fixtures
 # # --------------------------------------------
 @pytest.fixture(scope='function')
-def test_client():
+def test_client(app, db_transaction):
     """
-    Pytest fixture to set up a Flask test client with a MySQL test database.
+    Pytest fixture to set up a Flask test client on the test database, rolled back after each test.
     """
-    app = Initialize_app()
-    testing_client = app.test_client()
-    with app.app_context():
-        db.session.remove()
-        db.drop_all()
-        db.create_all()
-        yield testing_client
-        db.session.remove()
-        db.drop_all()
+    return app.test_client()
 
 
 def place_dummy_order(test_client, user_type):
@@ -62,18 +55,17 @@ def place_dummy_order(test_client, user_type):
     return response
 
 def reset_database(reset_flg):
-    """Reset database by executing SQL script using SQLAlchemy connection."""
-    THIS_FOLDER = Path(__file__).parent.resolve()
-    sql_file = "pytest_data.sql"
-    if reset_flg == 0:
-        sql_file = "pytest_data_reset.sql"
-    with open(THIS_FOLDER / sql_file, 'r') as f:
-        sql_statements = f.read()
-    with db.engine.connect() as connection:
-        with connection.begin():
-            for statement in sql_statements.split(';'):
-                if statement.strip():
-                    connection.execute(text(statement)) 
+    """Empty the tables, then load the sample data unless reset_flg is 0, in the transaction of the test."""
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    if reset_flg != 0:
+        with open(Path(__file__).parent.resolve() / "pytest_data.sql", 'r') as f:
+            sql_statements = f.read()
+        for statement in sql_statements.split(';'):
+            if statement.strip():
+                db.session.execute(text(statement))
+    # The items were changed behind the back of the catalog cache
+    catalog_cache.clear()
 
 def create_user(username, password, user_type='customer', first_name='First', last_name='Last', max_owing=500):
 
@@ -128,7 +120,7 @@ def create_item(name='Carrot', price=2.0, stock_quantity=100, item_type='Veggie'
     
     item = None
     if item_type == "new":
-        item = UnitPriceVeggie (
+        item = Veggie (
             name=name,
             description=f'Fresh {name}',
             price=price,
@@ -136,8 +128,7 @@ def create_item(name='Carrot', price=2.0, stock_quantity=100, item_type='Veggie'
             stock_quantity=stock_quantity,
             veg_name = name,
             staff_id = staff_id,
-            price_per_unit = 3.0,
-            quantity = 3
+            unit_pricing = UnitPricing(price_per_unit = 3.0, quantity = 3)
         )
     else:
         item = Item(
@@ -186,6 +177,20 @@ def test_login_success(test_client):
     with test_client.session_transaction() as sess:
         assert sess['user_id'] is not None
 
+def test_login_single_query(test_client, count_queries):
+    """
+    Test that logging in tells staff and customers apart without probing the subtype tables.
+    """
+    create_user('customer1', 'custpass', user_type='customer')
+    db.session.commit()
+
+    with count_queries() as statements:
+        test_client.post('/login', data={'username': 'customer1', 'password': 'custpass'})
+    assert len(statements) == 1
+
+    with test_client.session_transaction() as sess:
+        assert sess['user_type'] == 'customer'
+
 def test_login_failure(test_client):
     """
     Test logging in with invalid credentials.
@@ -246,6 +251,32 @@ def test_view_vegetables(test_client):
     assert b"carrot" in response.data.lower()
     assert b"veggie box" in response.data.lower()
 
+def test_view_vegetables_conditional_get(test_client, monkeypatch, count_queries):
+    """
+    Test that an unchanged vegetables page is answered with 304 without touching the database.
+    """
+    monkeypatch.setitem(test_client.application.config, 'CATALOG_VERSION_POLL_SECONDS', 60)
+    create_user('testuser', 'testpass', user_type='customer')
+    login(test_client, 'testuser', 'testpass')
+    create_item('Carrot', 2.0, 100, 'Veggie')
+
+    response = test_client.get('/vegetables')
+    etag = response.headers['ETag']
+    with count_queries() as statements:
+        response = test_client.get('/vegetables', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    # The catalog comes from the cache, only the stock is read
+    assert len(statements) == 1
+
+    # Changing the catalog changes the ETag
+    item = Item.query.filter_by(name='Carrot').first()
+    item.price = 3.0
+    db.session.commit()
+    response = test_client.get('/vegetables', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
 def test_place_order_customer(test_client):
     """
     Test a customer placing an order.
@@ -273,12 +304,67 @@ def test_place_order_staff(test_client):
     assert len(orders) == 1
     assert orders[0].staff_id == 3
 
+def test_place_order_prices_lines_in_one_query(test_client, count_queries):
+    """
+    Test that order lines of different types are priced from a single catalog query.
+    """
+    reset_database(1)
+    login(test_client, '111', '123')
+
+    with count_queries() as statements:
+        response = test_client.post('/place_order', data={
+            'order_1': '1',
+            'order_type_1': 'unit',
+            'order_2': '2',
+            'order_type_2': 'weight'
+        })
+    assert response.status_code == 302
+
+    # 1 Carrot by unit at $5 plus 2 kg of Broccoli at $10 per kilo
+    order = Order.query.filter_by(order_customer=1).first()
+    assert order.total_amount == 25.0
+    subtype_selects = [s for s in statements if s.lstrip().upper().startswith("SELECT") and "unit_price_veggies" in s]
+    assert len(subtype_selects) == 1
+
+def test_place_order_single_transaction(test_client, count_queries):
+    """
+    Test that an order and all of its lines are written in one transaction with one bulk insert.
+    """
+    reset_database(1)
+    login(test_client, '111', '123')
+
+    # Inside the transaction of the test, the commits of the session release its SAVEPOINT
+    commits = []
+    def on_commit(conn, *args):
+        commits.append(conn)
+    event.listen(db.engine, "commit", on_commit)
+    event.listen(db.engine, "release_savepoint", on_commit)
+    try:
+        with count_queries() as statements:
+            response = test_client.post('/place_order', data={
+                'order_1': '1',
+                'order_type_1': 'unit',
+                'order_2': '1',
+                'order_type_2': 'pack'
+            })
+    finally:
+        event.remove(db.engine, "commit", on_commit)
+        event.remove(db.engine, "release_savepoint", on_commit)
+    assert response.status_code == 302
+
+    assert len(commits) == 1
+    line_inserts = [s for s in statements if s.lstrip().upper().startswith("INSERT INTO ORDER_LINES")]
+    assert len(line_inserts) == 1
+    order = Order.query.filter_by(order_customer=1).first()
+    assert len(order.order_lines) == 2
+
 def test_place_order_insufficient_stock(test_client):
     """
     Test placing an order when there is insufficient stock.
     """
-    create_user('customer3', 'custpass', user_type='customer')
-    item = create_item('Cucumber', 0.5, 5, 'Veggie')  # Only 5 in stock
+    create_user('customer3', 'custpass', user_type='customer', max_owing=100)
+    staff = create_user('staff3', 'staffpass', user_type='staff')
+    item = create_item('Cucumber', 0.5, 5, 'new', staff_id=staff.id)  # Only 5 in stock
     login(test_client, 'customer3', 'custpass')
 
     response = test_client.post('/place_order', data={
@@ -287,6 +373,7 @@ def test_place_order_insufficient_stock(test_client):
     }, follow_redirects=True)
 
     assert response.status_code == 200
+    assert 'Available: 5' in response.get_data(as_text=True)
 
 
 def test_checkout(test_client):
@@ -314,6 +401,27 @@ def test_checkout(test_client):
     assert payment is not None
     assert order.order_status == 'Completed'
 
+def test_checkout_partial_payments(test_client):
+    """
+    Test paying an order in two partial payments.
+    """
+    place_dummy_order(test_client, "customer")
+    order = Order.query.filter_by(order_customer=1).first()
+
+    for _ in range(2):
+        test_client.post(f'/checkout/{order.id}', data={
+            'payment_method': 'Credit Card',
+            'payment_amount': str(order.total_amount / 2),
+            'card_number': '4111111111111111',
+            'card_expiry_date': '12/25',
+            'card_type': 'Visa'
+        }, follow_redirects=True)
+
+    payments = Payment.query.filter_by(order_id=order.id).all()
+    assert len(payments) == 2
+    assert payments[0].payment_id != payments[1].payment_id
+    assert order.order_status == 'Completed'
+
 def test_view_my_orders(test_client):
     """
     Test viewing orders for a customer.
@@ -324,6 +432,26 @@ def test_view_my_orders(test_client):
     assert response.status_code == 200
     assert b"carrot by unit - quantity: 1" in response.data.lower()
 
+def test_view_my_orders_query_count(test_client, count_queries):
+    """
+    Test that the number of queries for viewing all orders does not grow with the number of orders.
+    """
+    place_dummy_order(test_client, "customer")
+    with count_queries() as statements:
+        response = test_client.get('/my_orders/0')
+    assert response.status_code == 200
+    queries_for_one_order = len(statements)
+
+    for _ in range(4):
+        test_client.post('/place_order', data={'order_1': '1', 'order_type_1': 'unit'})
+    assert Order.query.filter_by(order_customer=1).count() == 5
+
+    with count_queries() as statements:
+        response = test_client.get('/my_orders/0')
+    assert response.status_code == 200
+    assert response.data.lower().count(b"carrot by unit") == 5
+    assert len(statements) == queries_for_one_order
+
 def test_view_current_orders(test_client):
     """
     Test viewing current (pending) orders.
@@ -335,6 +463,72 @@ def test_view_current_orders(test_client):
     assert response.status_code == 200
     assert b"current orders" in response.data.lower()
 
+def test_view_current_orders_pagination(test_client, count_queries):
+    """
+    Test that staff page through pending orders with stable next page links.
+    """
+    place_dummy_order(test_client, "staff")
+    for _ in range(4):
+        test_client.post('/place_order', data={'customer_id': '1', 'order_1': '1', 'order_type_1': 'unit'})
+    order_numbers = {order.order_number for order in Order.query.all()}
+    assert len(order_numbers) == 5
+
+    seen = []
+    url = '/current_orders?per_page=2'
+    while url:
+        with count_queries() as statements:
+            response = test_client.get(url)
+        assert response.status_code == 200
+        # Orders and their customer names are loaded by a single query, next to the version stamp
+        assert len([s for s in statements if "FROM orders" in s and "count(orders.id)" not in s]) == 1
+        page = [number for number in order_numbers if number.encode() in response.data]
+        assert len(page) <= 2
+        seen.extend(page)
+        match = re.search(rb'href="([^"]*after=[^"]*)"', response.data)
+        url = html.unescape(match.group(1).decode()) if match else None
+
+    assert sorted(seen) == sorted(order_numbers)
+    assert b"john doe" in response.data.lower()
+
+def test_view_current_orders_conditional_get(test_client, count_queries):
+    """
+    Test that an unchanged order listing is answered with 304 before the listing query runs.
+    """
+    place_dummy_order(test_client, "customer")
+    response = test_client.get('/current_orders')
+    etag = response.headers['ETag']
+
+    with count_queries() as statements:
+        response = test_client.get('/current_orders', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert len(statements) == 1
+
+    # Other pages of the listing have their own ETag
+    response = test_client.get('/current_orders?per_page=1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+    # Renaming the customer shown in the listing changes it
+    customer = db.session.get(Customer, 1)
+    customer.first_name = 'Johnny'
+    db.session.commit()
+    response = test_client.get('/current_orders', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b"johnny" in response.data.lower()
+    etag = response.headers['ETag']
+
+    # A page carrying a flashed message is always rendered
+    test_client.post('/cancel_order/0')
+    response = test_client.get('/current_orders', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b"unable to cancel order" in response.data.lower()
+
+    # Cancelling the order changes the listing
+    order = Order.query.filter_by(order_customer=1).first()
+    test_client.post(f'/cancel_order/{order.id}', follow_redirects=True)
+    response = test_client.get('/current_orders', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
 def test_view_previous_orders(test_client):
     """
     Test viewing previous (completed) orders.
@@ -413,6 +607,32 @@ def test_view_customers(test_client):
     assert b"customer" in response.data.lower()
     assert b"corporate" in response.data.lower()
 
+def test_view_customers_single_query(test_client, count_queries):
+    """
+    Test that the customer directory is served by one query per page and pages through all customers.
+    """
+    create_user('staff3', 'staffpass', user_type='staff')
+    for i in range(4):
+        db.session.add(Customer(
+            first_name=f'private_{i}', last_name='Last', username=f'private{i}', password='custpass',
+            cust_address='123 Test St', cust_id=f'P{i}', distance_from_store=10.0
+        ))
+    create_user('corporate0', 'custpass', user_type='corporate', first_name='corporate_0')
+    login(test_client, 'staff3', 'staffpass')
+
+    with count_queries() as statements:
+        response = test_client.get('/customers?per_page=3')
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert b"private_0" in response.data and b"private_2" in response.data
+    assert b"private_3" not in response.data
+
+    match = re.search(rb'href="([^"]*after=[^"]*)"', response.data)
+    response = test_client.get(html.unescape(match.group(1).decode()))
+    assert b"private_3" in response.data
+    assert b"corporate_0" in response.data and b"Corporate" in response.data
+    assert b"after=" not in response.data
+
 def test_generate_customer_list(test_client):
     """
     Test generating customer list as CSV.
@@ -426,6 +646,31 @@ def test_generate_customer_list(test_client):
     assert response.mimetype == 'text/csv'
     assert b"Customer ID,First Name,Last Name,Address,Balance" in response.data
 
+def test_generate_customer_list_streaming(test_client, monkeypatch):
+    """
+    Test that the customer CSV is properly escaped, streamed in chunks and can be gzip compressed.
+    """
+    monkeypatch.setitem(test_client.application.config, 'CSV_EXPORT_CHUNK_SIZE', 2)
+    create_user('staff4', 'staffpass', user_type='staff')
+    for i in range(5):
+        db.session.add(Customer(
+            first_name=f'first_{i}', last_name='Last', username=f'csv{i}', password='custpass',
+            cust_address=f'{i} Main St, Auckland', cust_balance=float(i), cust_id=f'CSV{i}', distance_from_store=10.0
+        ))
+    db.session.flush()
+    login(test_client, 'staff4', 'staffpass')
+
+    response = test_client.get('/generate_customer_list')
+    assert response.is_streamed
+    rows = list(csv.reader(io.StringIO(response.data.decode())))
+    assert rows[0] == ["Customer ID", "First Name", "Last Name", "Address", "Balance"]
+    assert len(rows) == 6
+    assert rows[1][1:] == ["first_0", "Last", "0 Main St, Auckland", "0.0"]
+
+    compressed = test_client.get('/generate_customer_list?compress=gzip')
+    assert compressed.mimetype == 'application/gzip'
+    assert gzip.decompress(compressed.data) == response.data
+
 def test_generate_report(test_client):
     """
     Test generating sales report.
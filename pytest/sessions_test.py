@@ -0,0 +1,155 @@
+# pytest/sessions_test.py
+import sys, os
+# Get the parent directory of the current file (sessions_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import pytest
+from datetime import timedelta
+from sqlalchemy import func, select
+from models import db, Staff, ServerSession
+from catalog import catalog_cache
+from sessions import (DatabaseSessionStore, KeyValueSessionStore, MemoryKeyValueClient,
+                      ServerSideSessionInterface, init_sessions)
+from app import create_app
+from main import Initialize_app
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='function')
+def test_app(clean_tables):
+    """
+    Pytest fixture to set up an app of its own on the test database with a staff member, emptied after each test.
+    """
+    app = Initialize_app()
+    with app.app_context():
+        catalog_cache.clear()
+        db.session.add(Staff(first_name='Alice', last_name='Staff', username='staff', password='123',
+                             dept_name='Sales', staff_id='S1'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+class Clock:
+    """Clock that only moves when told to."""
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def login(client):
+    return client.post('/login', data={'username': 'staff', 'password': '123'})
+
+def session_cookie(client):
+    return client.get_cookie('session').value
+
+def count_server_sessions():
+    return db.session.execute(select(func.count()).select_from(ServerSession)).scalar()
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_secret_key_is_stable(monkeypatch):
+    """
+    Test that every worker signs sessions with the same key, taken from SECRET_KEY when it is set.
+    """
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    assert create_app().secret_key == create_app().secret_key
+    monkeypatch.setenv('SECRET_KEY', 'shared-secret')
+    assert create_app().secret_key == 'shared-secret'
+
+def test_cookie_session_works_across_workers(test_app):
+    """
+    Test that a cookie session signed by one worker is accepted by another.
+    """
+    client = test_app.test_client()
+    login(client)
+    other_worker = Initialize_app().test_client()
+    other_worker.set_cookie('session', session_cookie(client))
+    assert b"Welcome Alice Staff" in other_worker.get('/dashboard').data
+
+def test_key_value_sessions_shared_between_workers(test_app):
+    """
+    Test that workers sharing a key-value store share the sessions, with only the session id in the cookie.
+    """
+    store = KeyValueSessionStore(MemoryKeyValueClient())
+    other_app = Initialize_app()
+    test_app.session_interface = ServerSideSessionInterface(store)
+    other_app.session_interface = ServerSideSessionInterface(store)
+
+    client = test_app.test_client()
+    login(client)
+    cookie = session_cookie(client)
+    assert b"Alice" not in cookie.encode() and len(cookie) < 100
+
+    other_worker = other_app.test_client()
+    other_worker.set_cookie('session', cookie)
+    assert b"Welcome Alice Staff" in other_worker.get('/dashboard').data
+
+    # A forged session id is not accepted
+    other_worker.set_cookie('session', 'forged.' + cookie.split('.')[-1])
+    assert other_worker.get('/dashboard').status_code == 302
+
+def test_login_moves_session_to_new_id(test_app):
+    """
+    Test that the session id known before logging in is useless after it.
+    """
+    test_app.config['SESSION_BACKEND'] = 'memory'
+    init_sessions(test_app)
+    client = test_app.test_client()
+    with client.session_transaction() as sess:
+        sess['planted'] = True
+    planted = session_cookie(client)
+    login(client)
+    assert session_cookie(client) != planted
+
+    attacker = test_app.test_client()
+    attacker.set_cookie('session', planted)
+    assert attacker.get('/dashboard').status_code == 302
+
+def test_database_sessions(test_app):
+    """
+    Test that the database backend stores sessions in the server_sessions table and forgets them at logout.
+    """
+    test_app.config['SESSION_BACKEND'] = 'database'
+    init_sessions(test_app)
+    client = test_app.test_client()
+    login(client)
+    assert count_server_sessions() == 1
+    assert b"Welcome Alice Staff" in client.get('/dashboard').data
+
+    client.get('/logout')
+    client.get('/login')
+    assert count_server_sessions() == 0
+
+def test_database_sessions_expire_and_are_swept(test_app):
+    """
+    Test that expired sessions are not loaded and are swept by the next write after the sweep interval.
+    """
+    clock = Clock()
+    store = DatabaseSessionStore(sweep_seconds=60, clock=clock)
+    store.save('old', {'user_id': 1}, timedelta(seconds=-1))
+    store.save('current', {'user_id': 2}, timedelta(hours=1))
+    assert store.load('old') is None
+    assert store.load('current') == {'user_id': 2}
+    assert count_server_sessions() == 2
+
+    clock.now = 61
+    store.save('current', {'user_id': 2, 'seen': True}, timedelta(hours=1))
+    assert count_server_sessions() == 1
+    assert store.load('current') == {'user_id': 2, 'seen': True}
+
+def test_memory_client_expires_keys():
+    """
+    Test the in-memory stand-in for a key-value store expires keys like one.
+    """
+    clock = Clock()
+    client = MemoryKeyValueClient(clock=clock)
+    client.setex('key', 10, 'value')
+    clock.now = 9
+    assert client.get('key') == 'value'
+    clock.now = 10
+    assert client.get('key') is None
@@ -0,0 +1,82 @@
+# pytest/wsgi_test.py
+import sys, os
+# Get the parent directory of the current file (wsgi_test.py)
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Add the parent directory to sys.path
+sys.path.insert(0, parent_dir)
+import runpy
+import subprocess
+from types import SimpleNamespace
+import pytest
+import order_numbers
+from sqlalchemy import text
+from models import db
+
+# --------------------------------------------
+# Fixtures
+# --------------------------------------------
+
+@pytest.fixture(scope='module')
+def wsgi_app(app):
+    """
+    Pytest fixture importing the WSGI entry point, which builds its app on the test database.
+    """
+    import wsgi
+    return wsgi.app
+
+# --------------------------------------------
+# Test Functions
+# --------------------------------------------
+
+def test_importing_models_builds_no_app():
+    """
+    Test that importing the models neither builds an app nor binds the database to one.
+    """
+    check = ("import sys, flask, models; "
+             "assert 'app' not in sys.modules; "
+             "assert not any(isinstance(value, flask.Flask) for value in vars(models).values())")
+    subprocess.run([sys.executable, '-c', check], cwd=parent_dir, check=True)
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_worker_opens_connections_of_its_own(wsgi_app):
+    """
+    Test that a process forked from a preloaded app does not reuse the connections of its parent.
+    """
+    with wsgi_app.app_context():
+        pool = db.engine.pool
+        with db.engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    pid = os.fork()
+    if pid == 0:
+        # Leave the child through os._exit whatever happens, so it never runs the rest of the test session
+        status = 1
+        try:
+            with wsgi_app.app_context():
+                status = 0 if db.engine.pool is not pool else 1
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    with wsgi_app.app_context():
+        assert db.engine.pool is pool
+
+def test_gunicorn_workers_get_distinct_indexes(monkeypatch):
+    """
+    Test that gunicorn.conf.py gives every new worker the lowest index no live worker has.
+    """
+    monkeypatch.delenv('ORDER_NODE_ID', raising=False)
+    monkeypatch.setattr(order_numbers, '_worker_index', None)
+    config = runpy.run_path(os.path.join(parent_dir, 'gunicorn.conf.py'))
+    server = SimpleNamespace(WORKERS={})
+    for pid in (101, 102, 103):
+        worker = SimpleNamespace(pid=pid)
+        config['pre_fork'](server, worker)
+        server.WORKERS[pid] = worker
+    assert [worker.order_worker_index for worker in server.WORKERS.values()] == [0, 1, 2]
+    del server.WORKERS[102]
+    replacement = SimpleNamespace(pid=104)
+    config['pre_fork'](server, replacement)
+    assert replacement.order_worker_index == 1
+    config['post_fork'](server, replacement)
+    assert order_numbers.get_generator().worker_id == 1
+    order_numbers.set_generator(None)
@@ -0,0 +1,199 @@
+"""
+@file
+@brief This module records the SQL statements issued by every request.
+@details SQLAlchemy cursor events count the statements of each request and time them, keep the
+         slowest one, and group them by shape: a statement run QUERY_STATS_N_PLUS_ONE_THRESHOLD
+         times or more in one request (usually one query per row of a listing) is reported as an
+         N+1 pattern. The figures of a request are sent as X-DB-* response headers in debug mode
+         (or with QUERY_STATS_HEADERS), logged as one JSON line with QUERY_STATS_LOG, and the last
+         QUERY_STATS_HISTORY requests of each worker are listed, worst first, at /debug/requests.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("query_stats")
+
+# Longest statement text kept, in characters
+STATEMENT_LENGTH = 500
+
+# Lists of bound parameters, e.g. the values of an IN clause, whose length varies between runs of one statement
+_PARAMETER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+
+def statement_shape(statement):
+    """
+    @brief Reduce a statement to its shape, the same for every run of one query.
+    @param statement SQL statement sent to the database.
+    @return Statement with whitespace collapsed and parameter lists reduced to one parameter.
+    """
+    return _PARAMETER_LIST.sub("(?)", " ".join(statement.split()))
+
+class RequestStats:
+    """
+    @brief Statements issued by one request.
+    """
+
+    def __init__(self, method, path, endpoint):
+        """
+        @brief Start recording a request.
+        @param method HTTP method.
+        @param path Path of the request, with its query string.
+        @param endpoint Name of the view.
+        """
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        """
+        @brief Record one statement.
+        @param statement SQL statement.
+        @param elapsed Seconds the statement took.
+        """
+        self.count += 1
+        self.db_time += elapsed
+        if self.slowest_statement is None or elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement[:STATEMENT_LENGTH]
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """
+        @brief Find the statements run too often to be anything but one query per row.
+        @param threshold Number of runs from which a statement is reported.
+        @return List of (statement shape, runs), most runs first.
+        """
+        return [(shape[:STATEMENT_LENGTH], runs) for shape, runs in self.shapes.most_common() if runs >= threshold]
+
+    def as_dict(self, threshold):
+        """
+        @brief Summarize the request.
+        @param threshold Number of runs from which a statement is reported as an N+1 pattern.
+        @return Dictionary of the figures of the request.
+        """
+        return {
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "query_count": self.count,
+            "db_time_ms": round(self.db_time * 1000, 3),
+            "slowest_ms": round(self.slowest_time * 1000, 3),
+            "slowest_statement": self.slowest_statement,
+            "n_plus_one": [{"statement": shape, "runs": runs} for shape, runs in self.repeated(threshold)],
+        }
+
+class RequestHistory:
+    """
+    @brief Thread-safe record of the last requests of one worker process.
+    """
+
+    def __init__(self, size):
+        """
+        @brief Create an empty history.
+        @param size Number of requests kept.
+        """
+        self._lock = threading.Lock()
+        self._requests = deque(maxlen=size)
+
+    def add(self, summary):
+        with self._lock:
+            self._requests.append(summary)
+
+    def worst(self, key, limit):
+        """
+        @brief List the worst recent requests.
+        @param key Figure to sort by, e.g. 'db_time_ms' or 'query_count'.
+        @param limit Number of requests listed.
+        @return List of request summaries, worst first.
+        """
+        with self._lock:
+            requests = list(self._requests)
+        return sorted(requests, key=lambda summary: summary[key] or 0, reverse=True)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_statement_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and has_request_context() and g.get("query_stats") is not None:
+        context.query_stats_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "query_stats_started", None)
+    if started is not None and has_request_context() and g.get("query_stats") is not None:
+        g.query_stats.record(statement, time.perf_counter() - started)
+
+def init_query_stats(app):
+    """
+    @brief Record the statements of every request of the app.
+    @details Call before any other request hook is registered, so the queries of those hooks are counted.
+    @param app Flask application.
+    """
+    history = RequestHistory(app.config["QUERY_STATS_HISTORY"])
+    app.extensions["query_stats"] = history
+    threshold = app.config["QUERY_STATS_N_PLUS_ONE_THRESHOLD"]
+    if app.config["QUERY_STATS_LOG"] and not logger.handlers:
+        # One JSON object per line, for the log collector to parse
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = RequestStats(request.method, request.full_path.rstrip("?"), request.endpoint)
+
+    @app.after_request
+    def add_query_stats_headers(response):
+        stats = g.get("query_stats")
+        show = app.config["QUERY_STATS_HEADERS"]
+        if stats is not None and (app.debug if show is None else show):
+            # Streamed responses run more queries after the headers are sent, those are only logged
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.3f}"
+            response.headers["X-DB-Slowest-Ms"] = f"{stats.slowest_time * 1000:.3f}"
+            response.headers["X-DB-N-Plus-One"] = str(len(stats.repeated(threshold)))
+        if stats is not None:
+            stats.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_query_stats(exception):
+        stats = g.pop("query_stats", None)
+        if stats is None:
+            return
+        stats.duration = time.perf_counter() - stats.started
+        if exception is not None:
+            stats.status = 500
+        summary = stats.as_dict(threshold)
+        history.add(summary)
+        if app.config["QUERY_STATS_LOG"]:
+            logger.info(json.dumps(summary))
+
+def worst_requests(key="db_time_ms", limit=50):
+    """
+    @brief List the worst recent requests of this worker.
+    @param key Figure to sort by.
+    @param limit Number of requests listed.
+    @return List of request summaries, worst first.
+    """
+    return current_app.extensions["query_stats"].worst(key, limit)
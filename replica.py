@@ -0,0 +1,132 @@
+"""
+@file
+@brief This module routes the reads of designated read-only routes to a read replica.
+@details When REPLICA_DATABASE_URL is set, the replica is configured as the 'replica' bind, and
+         views decorated with read_from_replica run their queries on it. Anything that writes,
+         and every other route, keeps using the primary. A replica that cannot be reached, has
+         stopped replicating or lags more than REPLICA_MAX_LAG_SECONDS behind the primary is
+         not used; its health is checked at most every REPLICA_CHECK_SECONDS per worker.
+"""
+
+import functools
+import threading
+import time
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.exc import DBAPIError
+
+REPLICA_BIND = 'replica'
+
+def replication_lag(connection):
+    """
+    @brief Measure how far the database behind a connection lags behind its primary.
+    @param connection Connection to the replica.
+    @return Lag in seconds, 0 for a database that is not replicating, or None if replication has stopped.
+    """
+    if connection.dialect.name != 'mysql':
+        return 0.0
+    try:
+        row = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+    except DBAPIError:
+        # Servers older than MySQL 8.0.22
+        connection.rollback()
+        row = connection.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+    if row is None:
+        return 0.0
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return None if lag is None else float(lag)
+
+class ReplicaMonitor:
+    """
+    @brief Thread-safe health of the read replica, as seen by one worker process.
+    """
+
+    def __init__(self, max_lag_seconds, check_seconds, lag_probe=replication_lag, clock=time.monotonic):
+        """
+        @brief Create the monitor; the replica is checked on first use.
+        @param max_lag_seconds Largest lag at which the replica is still used.
+        @param check_seconds Seconds to trust the last check.
+        @param lag_probe Function measuring the lag through a connection, see replication_lag.
+        @param clock Function returning the current time in seconds.
+        """
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.lag_probe = lag_probe
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self.healthy = False
+        self.lag = None
+
+    def _fresh(self, now):
+        return self._checked_at is not None and now - self._checked_at < self.check_seconds
+
+    def usable(self, engine):
+        """
+        @brief Tell whether reads may go to the replica.
+        @param engine Engine of the replica.
+        @return True if the replica is reachable and close enough to the primary.
+        """
+        now = self._clock()
+        if self._fresh(now):
+            return self.healthy
+        with self._lock:
+            if self._fresh(now):
+                return self.healthy
+            try:
+                with engine.connect() as connection:
+                    self.lag = self.lag_probe(connection)
+            except DBAPIError:
+                self.lag = None
+            healthy = self.lag is not None and self.lag <= self.max_lag_seconds
+            if self.healthy and not healthy:
+                current_app.logger.warning("Read replica unusable (lag %s), reading from the primary", self.lag)
+            self.healthy = healthy
+            self._checked_at = now
+            return self.healthy
+
+def init_read_replica(app):
+    """
+    @brief Start monitoring the read replica of the app, if it has one.
+    @param app Flask application.
+    """
+    if REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+        app.extensions['read_replica'] = ReplicaMonitor(
+            app.config['REPLICA_MAX_LAG_SECONDS'],
+            app.config['REPLICA_CHECK_SECONDS'],
+            app.config.get('REPLICA_LAG_PROBE') or replication_lag,
+        )
+
+        @app.before_request
+        def read_from_primary():
+            # Only the views marked read_from_replica read from the replica
+            g.read_replica = False
+
+def read_from_replica(view):
+    """
+    @brief Decorate a view whose queries may run on the read replica.
+    @param view View function that only reads.
+    @return Decorated view function.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+class RoutingSession(Session):
+    """
+    @brief Session sending the reads of read-only routes to the replica, and everything else to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # A session bound to a connection, e.g. one joining the transaction of a test, uses nothing else
+        if bind is None and self.bind is not None:
+            return self.bind
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False) and has_app_context() \
+                and g.get('read_replica'):
+            monitor = current_app.extensions.get('read_replica')
+            engine = self._db.engines.get(REPLICA_BIND) if monitor is not None else None
+            if engine is not None and monitor.usable(engine):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
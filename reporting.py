@@ -0,0 +1,196 @@
+"""
+@file
+@brief This module maintains the sales rollups used by the staff reports.
+"""
+
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Person, Customer, CorporateCustomer, DailySales, Item, ItemDailySales, Order, OrderLine, Payment
+
+def customer_type_of(customer_id):
+    """
+    @brief Determine whether a customer is a corporate or a private customer.
+    @details Customers load as their concrete class, and one already loaded in the session is
+             taken from its identity map without a query.
+    @param customer_id Id of the customer.
+    @return 'Corporate' or 'Private'.
+    """
+    customer = db.session.get(Customer, customer_id)
+    return "Corporate" if isinstance(customer, CorporateCustomer) else "Private"
+
+def upsert_counters(table, rows, key_columns, counter_columns):
+    """
+    @brief Add to counter columns of rollup rows, creating the rows that do not exist yet.
+    @details Runs as a single multi-row upsert in the caller's transaction, so concurrent updates
+             of the same rows add up correctly and the counters commit or roll back with the caller.
+    @param table Rollup table.
+    @param rows List of dictionaries holding the key columns and the amounts to add.
+    @param key_columns Names of the primary key columns.
+    @param counter_columns Names of the columns to add to.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql_insert(table).values(rows)
+        statement = statement.on_duplicate_key_update(
+            {column: table.c[column] + statement.inserted[column] for column in counter_columns}
+        )
+        db.session.execute(statement)
+    elif dialect == "sqlite":
+        statement = sqlite_insert(table).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[column] for column in key_columns],
+            set_={column: table.c[column] + statement.excluded[column] for column in counter_columns},
+        )
+        db.session.execute(statement)
+    else:
+        for row in rows:
+            result = db.session.execute(
+                update(table)
+                .where(*[table.c[column] == row[column] for column in key_columns])
+                .values({column: table.c[column] + row[column] for column in counter_columns})
+            )
+            if result.rowcount == 0:
+                db.session.execute(insert(table).values(row))
+
+def record_sale(payment_date, payment_method, customer_type, amount):
+    """
+    @brief Add a payment to the daily sales rollup.
+    @param payment_date Date and time of the payment.
+    @param payment_method Payment method of the payment.
+    @param customer_type 'Corporate' or 'Private'.
+    @param amount Amount paid.
+    """
+    upsert_counters(
+        DailySales.__table__,
+        [dict(sales_date=payment_date.date(), payment_method=payment_method, customer_type=customer_type,
+              total_amount=amount, payment_count=1)],
+        ["sales_date", "payment_method", "customer_type"],
+        ["total_amount", "payment_count"],
+    )
+
+def record_items_sold(order_date, order_lines, sign=1):
+    """
+    @brief Add the lines of an order to the per item daily sales counters.
+    @param order_date Date and time the order was placed.
+    @param order_lines Iterable of objects or dictionaries with item_number and quantity.
+    @param sign 1 when the order is placed, -1 when it is cancelled.
+    """
+    quantities = {}
+    for line in order_lines:
+        item_number = line["item_number"] if isinstance(line, dict) else line.item_number
+        quantity = line["quantity"] if isinstance(line, dict) else line.quantity
+        quantities[item_number] = quantities.get(item_number, 0) + sign * quantity
+    if not quantities:
+        return
+    upsert_counters(
+        ItemDailySales.__table__,
+        [dict(sales_date=order_date.date(), item_id=item_id, quantity_sold=quantity) for item_id, quantity in sorted(quantities.items())],
+        ["sales_date", "item_id"],
+        ["quantity_sold"],
+    )
+
+def top_items(days, limit):
+    """
+    @brief Find the best selling items of the last days.
+    @details Answered from the per item daily counters, so at most days rows per item are read.
+    @param days Length of the window in days, including today.
+    @param limit Maximum number of items to return.
+    @return List of (item name, quantity sold) tuples, best selling first.
+    """
+    start_date = datetime.now().date() - timedelta(days=days - 1)
+    quantity_sold = func.sum(ItemDailySales.quantity_sold)
+    return (
+        db.session.query(Item.name, quantity_sold)
+        .join(ItemDailySales, ItemDailySales.item_id == Item.id)
+        .filter(ItemDailySales.sales_date >= start_date)
+        .group_by(Item.id, Item.name)
+        .having(quantity_sold > 0)
+        .order_by(quantity_sold.desc())
+        .limit(limit)
+        .all()
+    )
+
+def backfill_daily_sales():
+    """
+    @brief Rebuild the daily sales rollup from the payments table.
+    @return Number of rollup rows written.
+    """
+    daily_sales = DailySales.__table__
+    payments = Payment.__table__
+    persons = Person.__table__
+    sales_date = func.date(payments.c.payment_date)
+    customer_type = case((persons.c.person_type == "corporate_customer", "Corporate"), else_="Private")
+
+    db.session.execute(daily_sales.delete())
+    db.session.execute(
+        insert(daily_sales).from_select(
+            ["sales_date", "payment_method", "customer_type", "total_amount", "payment_count"],
+            select(sales_date, payments.c.payment_method, customer_type,
+                   func.sum(payments.c.payment_amount), func.count(payments.c.id))
+            .select_from(payments.join(persons, persons.c.id == payments.c.customer_id))
+            .where(payments.c.payment_date.isnot(None))
+            .group_by(sales_date, payments.c.payment_method, customer_type)
+        )
+    )
+    db.session.commit()
+    return db.session.query(func.count()).select_from(daily_sales).scalar()
+
+def total_sales_since(start_date):
+    """
+    @brief Calculate the total sales from a point in time until now.
+    @details Whole days are summed from the daily sales rollup; only the payments of the first,
+             partial day are read from the (indexed) payments table.
+    @param start_date Date and time the report window starts at.
+    @return Total amount paid since start_date.
+    """
+    first_full_day = start_date.date() + timedelta(days=1)
+    rolled_up = (
+        db.session.query(func.sum(DailySales.total_amount))
+        .filter(DailySales.sales_date >= first_full_day)
+        .scalar()
+    ) or 0
+    first_day = (
+        db.session.query(func.sum(Payment.payment_amount))
+        .filter(Payment.payment_date >= start_date,
+                Payment.payment_date < datetime.combine(first_full_day, datetime.min.time()))
+        .scalar()
+    ) or 0
+    return rolled_up + first_day
+
+def backfill_item_sales():
+    """
+    @brief Rebuild the per item daily sales counters from the order lines of orders that are not cancelled.
+    @return Number of counter rows written.
+    """
+    item_daily_sales = ItemDailySales.__table__
+    orders = Order.__table__
+    order_lines = OrderLine.__table__
+    sales_date = func.date(orders.c.order_date)
+
+    db.session.execute(item_daily_sales.delete())
+    db.session.execute(
+        insert(item_daily_sales).from_select(
+            ["sales_date", "item_id", "quantity_sold"],
+            select(sales_date, order_lines.c.item_number, func.sum(order_lines.c.quantity))
+            .select_from(order_lines.join(orders, orders.c.id == order_lines.c.order_id))
+            .where(orders.c.order_date.isnot(None), orders.c.order_status != "Cancelled")
+            .group_by(sales_date, order_lines.c.item_number)
+        )
+    )
+    db.session.commit()
+    return db.session.query(func.count()).select_from(item_daily_sales).scalar()
+
+@click.command("backfill-daily-sales")
+def backfill_daily_sales_command():
+    """Rebuild the daily sales rollup from the payments table."""
+    rows = backfill_daily_sales()
+    click.echo(f"Daily sales rollup rebuilt with {rows} rows.")
+
+@click.command("backfill-item-sales")
+def backfill_item_sales_command():
+    """Rebuild the per item daily sales counters from the order lines."""
+    rows = backfill_item_sales()
+    click.echo(f"Item sales counters rebuilt with {rows} rows.")
@@ -0,0 +1,254 @@
+"""
+@file
+@brief This module provides server-side sessions shared by every worker and node serving the app.
+@details With the default 'cookie' backend the whole session is kept in the cookie, signed with the
+         secret key. The server-side backends keep the session in a store shared by all workers
+         instead, and the cookie only carries a signed random session id:
+         - 'database' keeps sessions in the server_sessions table, from which each worker sweeps
+           expired sessions every SESSION_SWEEP_SECONDS;
+         - 'kv' keeps them in the key-value client set as SESSION_KV_CLIENT, any client with the
+           get / setex / delete methods of redis-py;
+         - 'memory' keeps them in a MemoryKeyValueClient local to the worker process, a stand-in
+           for a key-value store in tests and single process development.
+"""
+
+import secrets
+import threading
+import time
+from datetime import datetime
+import click
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import delete, insert, select, update
+from werkzeug.datastructures import CallbackDict
+from models import db, ServerSession
+
+# Same serialization as the session cookie, so sessions may hold tuples, bytes, dates and markup
+serializer = TaggedJSONSerializer()
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """
+    @brief Session whose contents are kept in a session store.
+    """
+
+    def __init__(self, initial=None, sid=None, new=False):
+        """
+        @brief Create the session.
+        @param initial Contents loaded from the store.
+        @param sid Session id.
+        @param new True if the session is not in the store yet.
+        """
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """
+        @brief Move the session to a new id, so an id known before logging in is useless after it.
+        """
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = new_sid()
+        self.modified = True
+
+class MemoryKeyValueClient:
+    """
+    @brief Thread-safe in-memory key-value client with the subset of the redis-py interface sessions use.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        @brief Create an empty store.
+        @param clock Function returning the current time in seconds.
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get(self, key):
+        with self._lock:
+            value, expires_at = self._values.get(key, (None, None))
+            if expires_at is not None and expires_at <= self._clock():
+                del self._values[key]
+                return None
+            return value
+
+    def setex(self, key, seconds, value):
+        with self._lock:
+            self._values[key] = (value, self._clock() + seconds)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+class KeyValueSessionStore:
+    """
+    @brief Session store keeping sessions in a key-value store, which expires them itself.
+    """
+
+    def __init__(self, client, prefix="session:"):
+        """
+        @brief Create the store.
+        @param client Key-value client with get, setex and delete methods.
+        @param prefix Prefix of the keys of the sessions.
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def load(self, sid):
+        value = self.client.get(self.prefix + sid)
+        if value is None:
+            return None
+        return serializer.loads(value.decode() if isinstance(value, bytes) else value)
+
+    def save(self, sid, data, lifetime):
+        self.client.setex(self.prefix + sid, max(int(lifetime.total_seconds()), 1), serializer.dumps(data))
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+class DatabaseSessionStore:
+    """
+    @brief Session store keeping sessions in the server_sessions table.
+    @details Sessions are read and written on connections of their own, outside the transaction of the request.
+    """
+
+    def __init__(self, sweep_seconds=300, clock=time.monotonic):
+        """
+        @brief Create the store.
+        @param sweep_seconds Seconds between two sweeps of expired sessions by this worker.
+        @param clock Function returning the current time in seconds.
+        """
+        self.sweep_seconds = sweep_seconds
+        self._clock = clock
+        self._swept_at = clock()
+
+    def load(self, sid):
+        sessions = ServerSession.__table__
+        with db.engine.connect() as connection:
+            data = connection.execute(
+                select(sessions.c.data).where(sessions.c.sid == sid, sessions.c.expires_at > datetime.now())
+            ).scalar()
+        return None if data is None else serializer.loads(data)
+
+    def save(self, sid, data, lifetime):
+        sessions = ServerSession.__table__
+        values = {"data": serializer.dumps(data), "expires_at": datetime.now() + lifetime}
+        with db.engine.begin() as connection:
+            result = connection.execute(update(sessions).where(sessions.c.sid == sid).values(**values))
+            if result.rowcount == 0:
+                connection.execute(insert(sessions).values(sid=sid, **values))
+        if self._clock() - self._swept_at >= self.sweep_seconds:
+            self._swept_at = self._clock()
+            self.sweep()
+
+    def delete(self, sid):
+        sessions = ServerSession.__table__
+        with db.engine.begin() as connection:
+            connection.execute(delete(sessions).where(sessions.c.sid == sid))
+
+    def sweep(self):
+        """
+        @brief Delete the expired sessions.
+        @return Number of sessions deleted.
+        """
+        sessions = ServerSession.__table__
+        with db.engine.begin() as connection:
+            return connection.execute(delete(sessions).where(sessions.c.expires_at <= datetime.now())).rowcount
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    @brief Session interface keeping sessions in a session store, with only the signed session id in the cookie.
+    """
+
+    def __init__(self, store):
+        """
+        @brief Create the interface.
+        @param store Session store with load, save and delete methods.
+        """
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            data = self.store.load(sid) if sid else None
+            if data is not None:
+                return ServerSideSession(data, sid=sid)
+        # No cookie, a forged one or an expired session: start a new session with a fresh id
+        return ServerSideSession(sid=new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        partitioned = self.get_cookie_partitioned(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+
+        # A session emptied by the request is forgotten, an empty one is never stored
+        if not session:
+            if session.modified:
+                if not session.new:
+                    self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       partitioned=partitioned, samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.store.save(session.sid, dict(session), app.permanent_session_lifetime)
+        response.set_cookie(name, self._signer(app).sign(session.sid).decode(),
+                            expires=self.get_expiration_time(app, session), httponly=httponly, domain=domain,
+                            path=path, secure=secure, partitioned=partitioned, samesite=samesite)
+        response.vary.add("Cookie")
+
+def init_sessions(app):
+    """
+    @brief Install the session backend selected by SESSION_BACKEND.
+    @param app Flask application.
+    """
+    backend = app.config.get("SESSION_BACKEND", "cookie")
+    if backend == "cookie":
+        return
+    if backend == "database":
+        store = DatabaseSessionStore(app.config.get("SESSION_SWEEP_SECONDS", 300))
+    elif backend == "kv":
+        client = app.config.get("SESSION_KV_CLIENT")
+        if client is None:
+            raise ValueError("SESSION_BACKEND 'kv' needs a key-value client set as SESSION_KV_CLIENT")
+        store = KeyValueSessionStore(client)
+    elif backend == "memory":
+        store = KeyValueSessionStore(MemoryKeyValueClient())
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND {backend!r}")
+    app.session_interface = ServerSideSessionInterface(store)
+
+@click.command("sweep-sessions")
+def sweep_sessions_command():
+    """Delete the expired sessions from the server_sessions table."""
+    swept = DatabaseSessionStore().sweep()
+    click.echo(f"{swept} expired sessions deleted.")
@@ -0,0 +1,26 @@
+"""
+@file
+@brief This module is the WSGI entry point of the application, served with `gunicorn wsgi:app`.
+@details The app is built once, on import. With gunicorn.conf.py, which preloads the app, that
+         happens in the master process, and every worker forked from it starts with the app ready
+         instead of building its own. Connections the master opened while building the app must not
+         be shared by the workers, so each forked process drops the pools it inherited and opens
+         connections of its own on first use.
+"""
+
+import os
+from main import Initialize_app
+from models import db
+
+app = Initialize_app()
+
+def dispose_inherited_connections():
+    """
+    @brief Drop the connection pools inherited from the parent process, in a forked child.
+    @details The connections are left open rather than closed, since they still belong to the parent.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=dispose_inherited_connections)